@@ -0,0 +1,113 @@
+import re
+
+import pandas as pd
+
+import clean_csv
+
+# -------- VALEURS SENTINELLES ACS --------
+# Lues directement comme manquantes par le parser CSV
+NA_VALUES = ["(X)", "X", "N", "-", "**", "***", "*****", "(NA)"]
+
+LABEL_COL = "Label (Grouping)"
+
+# Clés entières des tables longues (tmp/)
+INTEGER_COLUMNS = {"year_id": "int64"}
+
+# -------- TYPES DE COLONNES --------
+# type -> caractères ignorés lors de la conversion numérique
+COLUMN_KINDS = {
+    "estimate": ",",      # 1,234
+    "percent": "%",       # 12.5%
+    "money": ",$",        # $34,876
+    "mixed": ",%",        # colonnes de profil: effectifs ou pourcentages selon la ligne
+}
+
+# -------- REGLES PAR SOURCE --------
+# Liste ordonnée (motif sur l'en-tête, type): la première règle qui correspond gagne.
+# Les colonnes sans règle restent des chaînes.
+SOURCE_RULES = {
+    "employment": [
+        (r"!!Percent$", "percent"),
+        (r"!!Estimate$", "estimate"),
+    ],
+    "income": [
+        (r"!!Estimate$", "mixed"),
+    ],
+    "education": [
+        (r"!!Percent[^!]*!!Estimate$", "percent"),
+        (r"!!Estimate$", "mixed"),
+    ],
+    "population_profile": [
+        (r"!!Estimate$", "mixed"),
+    ],
+    # Tables longues de tmp/ (mêmes règles que clean_csv pour les loaders)
+    "staging": [
+        (r"^Percent$", "percent"),
+        (r"^Estimate$", "estimate"),
+        (r"_Estimate$", "estimate"),
+    ],
+    # Tables de tmp/ publiées en pourcentage (staging.PERCENT_TABLES)
+    "staging_percent": [
+        (r"^Percent$", "percent"),
+        (r"_Estimate$", "percent"),
+    ],
+}
+
+_compiled_rules = {}
+
+
+def column_kinds(columns, source):
+    # en-tête -> type, pour les colonnes couvertes par les règles de la source
+    if source not in SOURCE_RULES:
+        raise ValueError(f"Source inconnue: {source} (attendu: {', '.join(sorted(SOURCE_RULES))})")
+    rules = _compiled_rules.setdefault(
+        source, [(re.compile(pattern), kind) for pattern, kind in SOURCE_RULES[source]]
+    )
+    kinds = {}
+    for col in columns:
+        for pattern, kind in rules:
+            if pattern.search(col):
+                kinds[col] = kind
+                break
+    return kinds
+
+
+# -------- LECTURE TYPEE --------
+def read_acs_csv(path, source, usecols=None, strip_labels=True):
+    """
+    Lit un CSV ACS avec des colonnes déjà typées.
+
+    Les sentinelles (NA_VALUES) deviennent NaN et les séparateurs de milliers
+    sont gérés par le parser: les colonnes purement numériques sortent du
+    reader en float64. Les colonnes où il reste des symboles ('%', '$')
+    passent ensuite par le noyau vectorisé de clean_csv. Les colonnes sans
+    règle (label, clés) restent des chaînes, sauf les clés
+    entières (INTEGER_COLUMNS).
+    """
+    header = pd.read_csv(path, nrows=0, usecols=usecols).columns
+    kinds = column_kinds(header, source)
+    text_cols = {col: INTEGER_COLUMNS.get(col, str) for col in header if col not in kinds}
+
+    df = pd.read_csv(
+        path,
+        usecols=usecols,
+        dtype=text_cols,
+        na_values=NA_VALUES,
+        thousands=",",
+    )
+
+    columns = {}
+    for col in df.columns:
+        kind = kinds.get(col)
+        if kind is None:
+            columns[col] = df[col]
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            columns[col] = df[col].astype("float64")
+        else:
+            columns[col] = clean_csv.clean_numeric_series(df[col], COLUMN_KINDS[kind])
+    # Reconstruction en une fois (évite un DataFrame fragmenté colonne par colonne)
+    df = pd.DataFrame(columns)
+
+    if strip_labels and LABEL_COL in df.columns:
+        df[LABEL_COL] = df[LABEL_COL].str.strip()
+    return df
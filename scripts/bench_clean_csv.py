@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark du nettoyage numérique de clean_csv.
+
+Compare Series.apply(clean_estimate / clean_percent), un appel Python par
+cellule, aux versions vectorisées (clean_estimate_series /
+clean_percent_series) sur une colonne de plusieurs millions de valeurs ACS,
+après avoir vérifié que les résultats sont identiques (NaN compris).
+
+Usage:
+    python bench_clean_csv.py --rows 3000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import clean_csv
+
+
+def make_column(n_rows, kind, seed=0):
+    # Mélange représentatif: nombres avec séparateurs, pourcentages,
+    # sentinelles "(X)"/"X", cellules vides et quelques valeurs invalides
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(0, 50_000_000, n_rows)
+    if kind == "estimate":
+        values = np.array([f"{v:,}" for v in numbers], dtype=object)
+    else:
+        values = np.array([f"{v / 500_000:.1f}%" for v in numbers], dtype=object)
+
+    draw = rng.random(n_rows)
+    values[draw < 0.05] = "(X)"
+    values[(draw >= 0.05) & (draw < 0.06)] = " X "
+    values[(draw >= 0.06) & (draw < 0.08)] = np.nan
+    values[(draw >= 0.08) & (draw < 0.081)] = "N"
+    return pd.Series(values, dtype=object)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3_000_000, help="taille de la colonne")
+    args = parser.parse_args()
+
+    cases = [
+        ("estimate", clean_csv.clean_estimate, clean_csv.clean_estimate_series),
+        ("percent", clean_csv.clean_percent, clean_csv.clean_percent_series),
+    ]
+    for kind, scalar, vectorized in cases:
+        column = make_column(args.rows, kind)
+
+        old, old_time = timed(lambda s: s.apply(scalar).astype("float64"), column)
+        new, new_time = timed(vectorized, column)
+
+        # Mêmes valeurs, mêmes NaN
+        np.testing.assert_array_equal(old.to_numpy(), new.to_numpy())
+
+        print(f"{kind:<9} {args.rows:>10} lignes | apply: {old_time:.3f} s | "
+              f"vectorisé: {new_time:.3f} s | x{old_time / new_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark du passage large -> long des tables education.
+
+Compare l'ancienne implémentation (stack(level=0) puis merge sur row_id pour
+rattacher year / education / tags) au noyau numpy de education_parser
+(plan de colonnes, repeat/tile des métadonnées, reshape du bloc de valeurs).
+Vérifie que les sorties sont identiques sur les fichiers 2021-2023 puis sur
+un fichier synthétique élargi, et affiche temps et pic mémoire (tracemalloc).
+
+Usage:
+    python bench_education_reshape.py --geos 3000 --repeat 3
+"""
+import argparse
+import os
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import education_parser as ep
+from acs_types import read_acs_csv
+from labels import as_text, normalize_labels
+
+EDUCATION_DIR = "../Data_Source_1/Data Source/education"
+
+
+# -------- ANCIENNE IMPLEMENTATION (référence) --------
+def parse_education_stack(df):
+    selected_cols, tuples = [], []
+    for c in df.columns:
+        if "!!" in c:
+            info = ep.split_metric_col(c)
+            if info is not None:
+                selected_cols.append(c)
+                tuples.append(info)
+
+    metrics_df = df[selected_cols].copy()
+    metrics_df.columns = pd.MultiIndex.from_tuples(tuples, names=["state", "metric"])
+    metrics_df = metrics_df[metrics_df.notna().any(axis=1)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        stacked = metrics_df.stack(level=0, dropna=False).reset_index(names=["row_id", "state"])
+
+    meta = ep.tag_sections(df)
+    meta.insert(0, "education", df["label_clean"])
+    meta.insert(0, "year", df["year"])
+    meta = as_text(meta).reset_index(names="row_id")
+    return meta.merge(stacked, on="row_id", how="right")
+
+
+# -------- DONNEES --------
+def load_years(folder=EDUCATION_DIR):
+    frames = []
+    for year in (2021, 2022, 2023):
+        df = read_acs_csv(os.path.join(folder, f"education_{year}.csv"), "education", strip_labels=False)
+        df["year"] = year
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    df["label_clean"] = normalize_labels(df["Label (Grouping)"])
+    return df
+
+
+def make_wide_frame(base, n_geos, seed=0):
+    # Mêmes libellés et années que les vrais fichiers, n_geos géographies
+    rng = np.random.default_rng(seed)
+    categories = ["Total", "Percent", "Male", "Percent Male", "Female", "Percent Female"]
+    data = {"Label (Grouping)": base["Label (Grouping)"], "year": base["year"]}
+    header_rows = base["label_clean"].str.isupper().to_numpy()
+    for i in range(n_geos):
+        for cat in categories:
+            values = rng.random(len(base)) * 1000
+            values[header_rows] = np.nan
+            data[f"County {i:05d}!!{cat}!!Estimate"] = values
+    df = pd.DataFrame(data)
+    df["label_clean"] = base["label_clean"]
+    return df
+
+
+def measure(func, df, repeat):
+    # meilleur temps sur `repeat` exécutions + pic mémoire d'une exécution
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, min(timings), peak
+
+
+def compare(name, df, repeat):
+    old, old_time, old_peak = measure(parse_education_stack, df, repeat)
+    new, new_time, new_peak = measure(ep.parse_education, df, repeat)
+    pd.testing.assert_frame_equal(old, new)
+    print(f"{name}: {len(new)} lignes longues, sorties identiques")
+    print(f"  stack + merge : {old_time:8.3f}s  pic {old_peak / 1e6:8.1f} Mo")
+    print(f"  noyau numpy   : {new_time:8.3f}s  pic {new_peak / 1e6:8.1f} Mo"
+          f"  (x{old_time / new_time:.1f} plus rapide, pic x{old_peak / new_peak:.1f} plus bas)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--geos", type=int, default=3000, help="nombre de géographies du fichier synthétique")
+    parser.add_argument("--repeat", type=int, default=3, help="nombre de mesures par implémentation")
+    args = parser.parse_args()
+
+    base = load_years()
+    compare("Fichiers 2021-2023", base, args.repeat)
+    compare(f"Synthétique ({args.geos} géographies)", make_wide_frame(base, args.geos), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
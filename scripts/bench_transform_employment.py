@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark du passage large -> long de transform_employment.
+
+Compare l'ancienne implémentation (iterrows x états, un dict par ligne) au
+reshape en colonnes entières (transform_employment.reshape_long, groupe par
+groupe) et au routage en une passe (transform_employment.split_groups),
+vérifie que les sorties sont identiques puis affiche les temps.
+
+Usage:
+    python bench_transform_employment.py --geos 3000 --repeat 3
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import transform_employment as te
+
+
+# -------- ANCIENNE IMPLEMENTATION (référence) --------
+def process_group_iterrows(df, group_name, group_labels, year_id, state_cols):
+    sub_df = df[df['Label (Grouping)'].isin(group_labels)].copy()
+
+    if group_name in te.summary_labels:
+        sub_df = sub_df[~sub_df['Label (Grouping)'].isin(te.summary_labels[group_name])]
+
+    records = []
+    for _, row in sub_df.iterrows():
+        for state in state_cols:
+            records.append({
+                'state_id': state,
+                'year_id': year_id,
+                'indicator': row['Label (Grouping)'],
+                'Estimate': row.get(f'{state}!!Estimate', None),
+                'Percent': row.get(f'{state}!!Percent', None)
+            })
+    return pd.DataFrame(records)
+
+
+# -------- DONNEES SYNTHETIQUES --------
+def make_wide_frame(n_geos, seed=0):
+    # Un fichier "employment" avec tous les labels des groupes et n_geos géographies
+    rng = np.random.default_rng(seed)
+    labels = list(dict.fromkeys(label for labels in te.groups.values() for label in labels))
+    state_cols = [f"County {i:05d}" for i in range(n_geos)]
+
+    data = {'Label (Grouping)': labels}
+    for state in state_cols:
+        estimates = rng.integers(0, 5_000_000, len(labels))
+        percents = rng.random(len(labels)) * 100
+        data[f'{state}!!Estimate'] = [f"{v:,}" for v in estimates]
+        data[f'{state}!!Percent'] = [f"{v:.1f}%" for v in percents]
+    return pd.DataFrame(data, dtype=str), state_cols
+
+
+def run(func, df, state_cols):
+    start = time.perf_counter()
+    tables = {
+        group_name: func(df, group_name, group_labels, 2023, state_cols)
+        for group_name, group_labels in te.groups.items()
+    }
+    return tables, time.perf_counter() - start
+
+
+def run_split(df, state_cols):
+    start = time.perf_counter()
+    tables = te.split_groups(df, 2023, state_cols)
+    return tables, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--geos", type=int, default=3000, help="nombre de géographies (colonnes Estimate/Percent)")
+    parser.add_argument("--repeat", type=int, default=3, help="nombre de mesures par implémentation")
+    args = parser.parse_args()
+
+    df, state_cols = make_wide_frame(args.geos)
+    print(f"Fichier synthétique: {len(df)} labels x {len(state_cols)} géographies")
+
+    old_times, new_times, split_times = [], [], []
+    for _ in range(args.repeat):
+        old_tables, elapsed = run(process_group_iterrows, df, state_cols)
+        old_times.append(elapsed)
+        new_tables, elapsed = run(te.process_group, df, state_cols)
+        new_times.append(elapsed)
+        split_tables, elapsed = run_split(df, state_cols)
+        split_times.append(elapsed)
+
+    # Les trois chemins doivent produire exactement les mêmes tables
+    for group_name in te.groups:
+        pd.testing.assert_frame_equal(old_tables[group_name], new_tables[group_name])
+        pd.testing.assert_frame_equal(old_tables[group_name], split_tables[group_name])
+    n_rows = sum(len(t) for t in new_tables.values())
+
+    old_best, new_best, split_best = min(old_times), min(new_times), min(split_times)
+    print(f"Lignes produites      : {n_rows}")
+    print(f"iterrows (ancien)     : {old_best:.3f} s")
+    print(f"reshape_long (nouveau): {new_best:.3f} s  (x{old_best / new_best:.1f})")
+    print(f"split_groups (1 passe): {split_best:.3f} s  (x{old_best / split_best:.1f})")
+
+
+if __name__ == "__main__":
+    main()
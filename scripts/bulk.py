@@ -0,0 +1,72 @@
+import pandas as pd
+
+# -------- CONFIG --------
+# Nombre de lignes envoyées par aller-retour / par transaction
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def add_batch_arguments(parser):
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help=f"Lignes par lot d'insertion (défaut: {DEFAULT_BATCH_SIZE}).",
+    )
+    return parser
+
+
+# -------- PREPARATION DES PARAMETRES --------
+def param_columns(data):
+    """
+    DataFrame (ou dict nom -> tableau) -> liste de colonnes de paramètres.
+
+    Conversion colonne par colonne, sans itérer sur les lignes: valeurs
+    natives Python (int/float/str) et None à la place de NaN/NA, comme
+    l'attendent les drivers DB-API.
+    """
+    items = data.items() if isinstance(data, pd.DataFrame) else dict(data).items()
+    columns = []
+    for _, values in items:
+        values = pd.Series(values)
+        values = values.astype(object).where(values.notna(), None)
+        columns.append(values.tolist())
+    return columns
+
+
+# -------- INSERTION PAR LOTS --------
+def insert_batches(conn, insert_sql, data, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Insère `data` par lots de `batch_size` lignes avec executemany.
+
+    Chaque lot est une transaction explicite (commit après le lot, rollback
+    et relance de l'erreur sinon). Avec pyodbc, fast_executemany envoie le
+    lot comme un tableau de paramètres en un seul aller-retour.
+    Retourne le nombre de lignes insérées.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size doit être >= 1 (reçu: {batch_size})")
+
+    columns = param_columns(data)
+    n_rows = len(columns[0]) if columns else 0
+
+    autocommit = getattr(conn, "autocommit", None)
+    if autocommit:
+        conn.autocommit = False
+    cursor = conn.cursor()
+    if hasattr(cursor, "fast_executemany"):
+        cursor.fast_executemany = True
+
+    try:
+        for start in range(0, n_rows, batch_size):
+            stop = min(start + batch_size, n_rows)
+            rows = list(zip(*(col[start:stop] for col in columns)))
+            try:
+                cursor.executemany(insert_sql, rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    finally:
+        cursor.close()
+        if autocommit:
+            conn.autocommit = autocommit
+
+    return n_rows
@@ -1,7 +1,12 @@
+import numpy as np
 import pandas as pd
 
+# Valeurs ACS "non applicable"
+SENTINELS = ["(X)", "X"]
+
+
 def clean_estimate(val):
-    if pd.isna(val) or str(val).strip() in ["(X)", "X"]:
+    if pd.isna(val) or str(val).strip() in SENTINELS:
         return None
     try:
         return float(str(val).replace(",", "").strip())
@@ -10,13 +15,109 @@ def clean_estimate(val):
 
 
 def clean_percent(val):
-    if pd.isna(val) or str(val).strip() in ["(X)", "X"]:
+    if pd.isna(val) or str(val).strip() in SENTINELS:
         return None
     try:
         return float(str(val).replace("%", "").strip())
     except ValueError:
         return None
 
+
+# -------- VERSIONS VECTORISEES (colonne entière) --------
+# numpy >= 2: fonctions de chaînes compilées (np.strings), sinon np.char
+_strings = getattr(np, "strings", np.char)
+
+_DIGITS_MAX = 15  # mantisse exacte en float64 (< 2**53)
+
+
+def _parse_simple_chunk(text, ignore):
+    # Analyse vectorisée des nombres simples "[+-]chiffres[.chiffres]" en
+    # ignorant les caractères de `ignore` (ex: ',' ou '%'), colonne de caractères par
+    # colonne de caractères sur le tableau unicode.
+    # La valeur est mantisse entière / 10**décimales: une seule division
+    # IEEE, donc exactement le même float que float(str).
+    n = len(text)
+    width = text.dtype.itemsize // 4
+    ok = np.ones(n, dtype=bool)
+    mantissa = np.zeros(n, dtype=np.int64)
+    n_digits = np.zeros(n, dtype=np.int64)
+    decimals = np.zeros(n, dtype=np.int64)
+    seen_dot = np.zeros(n, dtype=bool)
+    if width == 0:
+        return np.full(n, np.nan), np.zeros(n, dtype=bool)
+
+    chars = np.ascontiguousarray(text).view(np.uint32).reshape(n, width)
+    negative = chars[:, 0] == ord("-")
+    signed = negative | (chars[:, 0] == ord("+"))
+    for j in range(width):
+        c = chars[:, j]
+        digit = c.astype(np.int64) - ord("0")
+        is_digit = (digit >= 0) & (digit <= 9)
+        is_dot = c == ord(".")
+        allowed = is_digit | is_dot | (c == 0)
+        for ch in ignore:
+            allowed |= c == ord(ch)
+        if j == 0:
+            allowed |= signed
+        ok &= allowed & ~(is_dot & seen_dot)
+        seen_dot |= is_dot
+        mantissa = np.where(is_digit, mantissa * 10 + digit, mantissa)
+        n_digits += is_digit
+        decimals += is_digit & seen_dot
+
+    ok &= (n_digits > 0) & (n_digits <= _DIGITS_MAX)
+    values = mantissa / np.power(10.0, decimals)
+    values[negative] = -values[negative]
+    values[~ok] = np.nan
+    return values, ok
+
+
+def _parse_simple_numbers(text, ignore, chunk_size=1 << 14):
+    # Par blocs de lignes pour rester dans le cache processeur
+    values = np.empty(len(text))
+    ok = np.empty(len(text), dtype=bool)
+    for start in range(0, len(text), chunk_size):
+        stop = start + chunk_size
+        values[start:stop], ok[start:stop] = _parse_simple_chunk(text[start:stop], ignore)
+    return values, ok
+
+
+def clean_numeric_series(series, remove=","):
+    # Mêmes règles que clean_estimate / clean_percent, appliquées à toute la
+    # colonne: les caractères de `remove` sont supprimés, sentinelles et
+    # valeurs non convertibles -> NaN, résultat float64
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+
+    raw = series.to_numpy(dtype=object, copy=True)
+    raw[pd.isna(raw)] = ""
+    text = _strings.strip(raw.astype(str))
+
+    # Cas courant traité par le noyau vectorisé
+    values, simple = _parse_simple_numbers(text, remove)
+
+    # Le reste (rare: notation scientifique, espaces internes, valeurs
+    # invalides...) suit exactement l'ancienne règle via to_numeric; les
+    # sentinelles et cellules vides restent NaN
+    rest = ~simple & (text != "") & ~np.isin(text, SENTINELS)
+    if rest.any():
+        other = text[rest]
+        for ch in remove:
+            other = _strings.replace(other, ch, "")
+        other = _strings.strip(other)
+        values[rest] = pd.to_numeric(pd.Series(other, dtype=object), errors="coerce").to_numpy(dtype="float64")
+
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def clean_estimate_series(series):
+    return clean_numeric_series(series, ",")
+
+
+def clean_percent_series(series):
+    return clean_numeric_series(series, "%")
+
+
 def clean(df):
     # Renommer les colonnes
     df = df.rename(columns={
@@ -26,8 +127,8 @@ def clean(df):
         "Percent": "percent"
     })
 
-
-    df["estimate"] = df["estimate"].apply(clean_estimate)
-    df["percent"] = df["percent"].apply(clean_percent)
+    # Les tables de staging parquet sont déjà typées: le nettoyage les laisse telles quelles
+    df["estimate"] = clean_estimate_series(df["estimate"])
+    df["percent"] = clean_percent_series(df["percent"])
 
     return df
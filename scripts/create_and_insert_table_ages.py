@@ -1,117 +1,175 @@
+import os
+import time
+import uuid
+
 import pandas as pd
-from sqlalchemy import create_engine, Table, Column, Integer, Float, String, MetaData, UniqueConstraint
-from sqlalchemy.exc import IntegrityError
 
-from dotenv import load_dotenv
-import os
+import schema
+import sinks
+from acs_types import LABEL_COL, read_acs_csv
+from schema import AGE_COLUMNS
 
-load_dotenv()
-
-
-def import_ages_in_sql(year):
-    # Charger CSV (attention: adapte le séparateur et l’encodage si besoin)
-    df = pd.read_csv(f"../Data_Source_1/Data Source/population_profile/Population_profile_{year}.csv")
-    # Supprime les espaces avant/après les noms de colonnes
-    for col in df.select_dtypes(include=["object"]).columns:
-        df[col] = df[col].str.strip()
-
-
-    # On récupère les états
-    etats = {col.split("!!")[0] for col in df.columns if "!!" in col}
-
-
-    # Liste des tranches d’âge
-    ages = [
-        "Under 5 years",
-        "5 to 17 years",
-        "18 to 24 years",
-        "25 to 34 years",
-        "35 to 44 years",
-        "45 to 54 years",
-        "55 to 64 years",
-        "65 to 74 years",
-        "75 years and over",
-    ]
-    datas = []
-    # Pour chaque état et chaque ligne (chaque tranche d’âge)
-    for etat in etats:
-        data = {
-            "state": etat,
-            "year": year,
-            "Under_5_years": None,
-            "5_to_17_years": None,
-            "18_to_24_years": None,
-            "25_to_34_years": None,
-            "35_to_44_years": None,
-            "45_to_54_years": None,
-            "55_to_64_years": None,
-            "65_to_74_years": None,
-            "75_years_and_over": None,
-        }
-
-        for idx, age in enumerate(ages):
-            value = float(df.loc[df["Label (Grouping)"] == age, f"{etat}!!Total population!!Estimate"].iloc[0].replace("%", ""))
-
-            if age == "Under 5 years":
-                data["Under_5_years"] = value
-            elif age == "5 to 17 years":
-                data["5_to_17_years"] = value
-            elif age == "18 to 24 years":
-                data["18_to_24_years"] = value
-            elif age == "25 to 34 years":
-                data["25_to_34_years"] = value
-            elif age == "35 to 44 years":
-                data["35_to_44_years"] = value
-            elif age == "45 to 54 years":
-                data["45_to_54_years"] = value
-            elif age == "55 to 64 years":
-                data["55_to_64_years"] = value
-            elif age == "65 to 74 years":
-                data["65_to_74_years"] = value
-            elif age == "75 years and over":
-                data["75_years_and_over"] = value
-
-        datas.append(data)
-
-
-    # Transformer en DataFrame
-    df = pd.DataFrame(datas)
-
-    # Création de l'engine SQLAlchemy
-    engine = create_engine(
-        "mssql+pyodbc://localhost\\SQLEXPRESS/USA?driver=ODBC+Driver+17+for+SQL+Server&TrustServerCertificate=yes&Trusted_Connection=yes",
-        fast_executemany=True
-    )
+# insert: ignore les (state, year) déjà présents
+# update: met à jour les présents et insère les nouveaux (MERGE)
+# replace: supprime les années chargées puis les réinsère
+UPSERT_MODES = ("insert", "update", "replace")
 
-    metadata = MetaData()
 
-    # Définition de la table avec contrainte UNIQUE
-    age_population = Table(
-        "age_population", metadata,
+def age_columns():
+    # Nouvelles instances à chaque appel (une Column n'appartient qu'à une Table)
+    from sqlalchemy import Column, Float, Integer, String
+
+    return [
         Column("state", String(100), nullable=False),
         Column("year", Integer, nullable=False),
-        Column("Under_5_years", Float),
-        Column("5_to_17_years", Float),
-        Column("18_to_24_years", Float),
-        Column("25_to_34_years", Float),
-        Column("35_to_44_years", Float),
-        Column("45_to_54_years", Float),
-        Column("55_to_64_years", Float),
-        Column("65_to_74_years", Float),
-        Column("75_years_and_over", Float),
-        UniqueConstraint("state", "year", name="uq_state_year")  # 👈 contrainte UNIQUE
-    )
+    ] + [Column(col, Float) for col in AGE_COLUMNS]
+
+
+def merge_sql(cols, staging):
+    quoted = [f"[{col}]" for col in cols]
+    updates = ", ".join(f"t.[{col}] = s.[{col}]" for col in AGE_COLUMNS)
+    return f"""
+    MERGE age_population AS t
+    USING [{staging}] AS s
+        ON t.[state] = s.[state] AND t.[year] = s.[year]
+    WHEN MATCHED THEN
+        UPDATE SET {updates}
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT ({", ".join(quoted)})
+        VALUES ({", ".join("s." + col for col in quoted)});
+    """
+
+
+def upsert_ages(sink, df, mode="insert"):
+    """
+    Charge df dans age_population en ensembliste.
+
+    Les lignes sont d'abord chargées en bloc par le sink (executemany) dans
+    une table de staging propre à cet appel (age_population_staging_<id>:
+    deux chargements concurrents ne se mélangent pas), puis une seule
+    transaction applique la table de staging à la table cible selon `mode`
+    (voir UPSERT_MODES) et la supprime. Un échec laisse age_population
+    intacte et la table de staging est supprimée. Retourne les mesures du
+    chargement (lignes insérées ou mises à jour, octets envoyés, durée totale).
+    """
+    if mode not in UPSERT_MODES:
+        raise ValueError(f"Mode inconnu: {mode} (attendu: {', '.join(UPSERT_MODES)})")
+
+    from sqlalchemy import MetaData, Table, and_, exists, select, text
+
+    engine = sink.engine
+    start = time.perf_counter()
+    metadata = MetaData()
 
-    # Crée la table si elle n’existe pas
-    metadata.create_all(engine)
+    # Tables décrites pour les instructions ensemblistes
+    age_population = Table("age_population", metadata, *age_columns())
+    staging = Table(f"age_population_staging_{uuid.uuid4().hex[:12]}", metadata, *age_columns())
 
-    # Insérer en évitant les doublons
-    with engine.begin() as conn:
-        for _, row in df.iterrows():
-            try:
-                conn.execute(age_population.insert().values(**row.to_dict()))
-            except IntegrityError:
-                print(f"Doublon ignoré pour {row['etat']} - {row['year']}")
+    # Cible: design physique de schema.py (partitions, columnstore, index
+    # unique (state, year)); staging: simple table créée pour ce chargement
+    schema.prepare(engine, age_population.name, df)
+    metadata.create_all(engine, tables=[staging])
 
-    print(f"✅ Données insérées sans doublons pour {year}")
+    cols = [col.name for col in age_population.columns]
+    same_key = and_(age_population.c.state == staging.c.state, age_population.c.year == staging.c.year)
+    new_rows = age_population.insert().from_select(
+        cols, select(*staging.c).where(~exists().where(same_key))
+    )
 
+    try:
+        loaded = sink.write(staging.name, df[cols])
+
+        with engine.begin() as conn:
+            if mode == "insert":
+                n_rows = conn.execute(new_rows).rowcount
+            elif mode == "replace":
+                conn.execute(age_population.delete().where(
+                    age_population.c.year.in_(select(staging.c.year).distinct())
+                ))
+                n_rows = conn.execute(new_rows).rowcount
+            elif engine.dialect.name == "mssql":
+                n_rows = conn.execute(text(merge_sql(cols, staging.name))).rowcount
+            else:
+                # Pas de MERGE (ex: SQLite): UPDATE corrélé puis insertion des nouveaux
+                updated = conn.execute(age_population.update().where(exists().where(same_key)).values({
+                    age_population.c[col]: select(staging.c[col]).where(same_key).scalar_subquery()
+                    for col in AGE_COLUMNS
+                }))
+                result = conn.execute(new_rows)
+                n_rows = updated.rowcount + result.rowcount
+
+            staging.drop(conn)
+    except Exception:
+        # Table de staging de cet appel seulement: jamais laissée à moitié remplie
+        staging.drop(engine, checkfirst=True)
+        raise
+
+    return sinks.LoadStats(age_population.name, n_rows, loaded.nbytes, time.perf_counter() - start)
+
+
+# -------- EXTRACTION DES TRANCHES D'AGE --------
+PROFILE_DIR = "../Data_Source_1/Data Source/population_profile"
+TOTAL_SUFFIX = "!!Total population!!Estimate"
+
+# Libellé ACS de la tranche d’âge -> colonne de age_population
+AGE_GROUPS = dict(zip([
+    "Under 5 years",
+    "5 to 17 years",
+    "18 to 24 years",
+    "25 to 34 years",
+    "35 to 44 years",
+    "45 to 54 years",
+    "55 to 64 years",
+    "65 to 74 years",
+    "75 years and over",
+], AGE_COLUMNS))
+
+
+def profile_path(year, folder=PROFILE_DIR):
+    # La casse du nom varie selon l'année (Population_profile / Population_Profile)
+    target = f"population_profile_{year}.csv"
+    for name in os.listdir(folder):
+        if name.lower() == target:
+            return os.path.join(folder, name)
+    raise FileNotFoundError(f"Pas de fichier population_profile pour {year} dans {folder}")
+
+
+def extract_ages(years, folder=PROFILE_DIR):
+    """
+    Une ligne par (état, année) avec les 9 tranches d’âge, pour plusieurs années.
+
+    Par fichier: seules les colonnes "<état>!!Total population!!Estimate" sont
+    lues, les libellés sont indexés une fois (première occurrence), et les 9
+    lignes d'âge x tous les états sont prises en une seule sélection.
+    """
+    frames = []
+    for year in years:
+        # Charger CSV: sentinelles, milliers et '%' sont gérés à la lecture,
+        # les colonnes "!!Estimate" sortent déjà en float
+        df = read_acs_csv(profile_path(year, folder), "population_profile",
+                          usecols=lambda col: col == LABEL_COL or col.endswith(TOTAL_SUFFIX))
+
+        by_label = df.drop_duplicates(LABEL_COL).set_index(LABEL_COL)
+        block = by_label.reindex(list(AGE_GROUPS)).T   # états x tranches d’âge
+
+        frame = pd.DataFrame(block.to_numpy(dtype="float64"), columns=AGE_COLUMNS)
+        frame.insert(0, "state", [col[:-len(TOTAL_SUFFIX)] for col in block.index])
+        frame.insert(1, "year", year)
+        frames.append(frame)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def import_ages_in_sql(years, mode="insert", sink=None, folder=PROFILE_DIR):
+    # Une ou plusieurs années: un seul chargement en bloc pour toutes
+    years = [years] if isinstance(years, int) else list(years)
+    df = extract_ages(years, folder)
+
+    # Backend de chargement (engine poolé partagé)
+    sink = sink or sinks.get_sink()
+
+    # Staging + une seule instruction ensembliste (pas de ligne à ligne)
+    stats = upsert_ages(sink, df, mode)
+
+    print(f"✅ {stats.rows} ligne(s) chargée(s) pour {', '.join(map(str, years))} (mode {mode})")
+    return stats
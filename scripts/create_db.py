@@ -1,15 +1,13 @@
-import pyodbc
+import db
 
-# Connexion au serveur SQL Server (on se connecte à master pour créer la DB USA)
-conn = pyodbc.connect( "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=localhost\\SQLEXPRESS;"
-    "DATABASE=master;"
-    "Trusted_Connection=yes;"
-    "TrustServerCertificate=yes;",     autocommit=True
-)
 
-cursor = conn.cursor()
+def create_database():
+    # Connexion au serveur SQL Server (on se connecte à master pour créer la DB cible)
+    # CREATE DATABASE ne peut pas tourner dans une transaction: autocommit
+    with db.connect(database="master").execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Création de la DB (USA par défaut) si elle n'existe pas
+        conn.exec_driver_sql(f"IF DB_ID('{db.DATABASE}') IS NULL CREATE DATABASE [{db.DATABASE}];")
 
-# Création de la DB USA si elle n'existe pas
-cursor.execute("IF DB_ID('USA') IS NULL CREATE DATABASE USA;")
-conn.commit()
+
+if __name__ == "__main__":
+    create_database()
@@ -1,98 +1,54 @@
-import pandas as pd
-from sqlalchemy import create_engine
-import urllib
-from sqlalchemy.engine import Engine
-from dotenv import load_dotenv
-import os
+import argparse
+from typing import TYPE_CHECKING
 
-load_dotenv()
+import db
+import schema
 
-# ============ CONNEXION SQL SERVER ============
-def make_engine_trusted(server: str, database: str) -> Engine:
-    params = urllib.parse.quote_plus(
-        "DRIVER={ODBC Driver 17 for SQL Server};"  # Assurez-vous que le pilote est installé
-        f"SERVER={server};"
-        f"DATABASE={database};"
-        "Trusted_Connection=yes;"
-        "TrustServerCertificate=yes;"
-    )
-    return create_engine(f"mssql+pyodbc:///?odbc_connect={params}", fast_executemany=True, future=True)
-engine = make_engine_trusted("localhost\\SQLEXPRESS", "USA")
-
-
-# ============ CREATION DES TABLES ============
-def create_tables(engine: Engine) -> None:
-    """
-    Crée les tables nécessaires dans la base de données.
-    state, age, education, earning_by_education, age_by_education
-    """
-    # ============ DDL (DROP + CREATE) ============
-    DDL = r"""
-    IF OBJECT_ID('dbo.earning_by_education','U') IS NOT NULL DROP TABLE dbo.earning_by_education;
-    IF OBJECT_ID('dbo.age_by_education','U')    IS NOT NULL DROP TABLE dbo.age_by_education;
-    IF OBJECT_ID('dbo.education','U')           IS NOT NULL DROP TABLE dbo.education;
-    IF OBJECT_ID('dbo.age','U')                 IS NOT NULL DROP TABLE dbo.age;
-    IF OBJECT_ID('dbo.state','U')               IS NOT NULL DROP TABLE dbo.state;
-    IF OBJECT_ID('dbo.date','U')                IS NOT NULL DROP TABLE dbo.date;
-
-    CREATE TABLE dbo.state (
-        state_name          nvarchar(100) NOT NULL
-    );
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
 
-    CREATE TABLE dbo.age (
-        age_group           nvarchar(200) NOT NULL
-    );
 
-    CREATE TABLE dbo.date (
-        id   int IDENTITY(1,1) PRIMARY KEY,
-        year int NOT NULL
-    );
+# ============ CONNEXION SQL SERVER ============
+def make_engine_trusted(server: str, database: str) -> "Engine":
+    # Engine poolé partagé (registre db), même instance à chaque appel
+    return db.get_engine(server, database)
 
-    CREATE TABLE dbo.education (
-        education_level_name nvarchar(200) NOT NULL
-    );
 
-    /* Tables de faits (10 colonnes) */
-    CREATE TABLE dbo.age_by_education (
-        state              nvarchar(100) NOT NULL,
-        year               int           NOT NULL,
-        education          nvarchar(200) NOT NULL,
-        age_group          nvarchar(200) NOT NULL,
-        total_estimate     int           NULL,
-        total_percent      float         NULL,
-        male_estimate      int           NULL,
-        male_percent       float         NULL,
-        female_estimate    int           NULL,
-        female_percent     float         NULL
-    );
+# ============ CREATION DES TABLES ============
+def drop_tables(engine: "Engine", tables) -> None:
+    # Faits avant dimensions (clés étrangères)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in sorted(tables, key=lambda name: name in schema.DIMENSION_TABLES):
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {quote(table)}")
 
-    CREATE TABLE dbo.earning_by_education (
-        state              nvarchar(100) NOT NULL,
-        year               int           NOT NULL,
-        education          nvarchar(200) NOT NULL,
-        age_group          nvarchar(200) NOT NULL,
-        total_estimate     int           NULL,
-        total_percent      float         NULL,
-        male_estimate      int           NULL,
-        male_percent       float         NULL,
-        female_estimate    int           NULL,
-        female_percent     float         NULL
-    );
 
-    /* Index conseillés pour les requêtes typiques */
-    CREATE INDEX IX_age_by_education_state_year ON dbo.age_by_education(state, year);
-    CREATE INDEX IX_earning_by_education_state_year ON dbo.earning_by_education(state, year);
+def create_tables(engine: "Engine", reset: bool = False) -> None:
     """
-    
+    Crée les tables nécessaires dans la base de données, avec le design
+    physique généré par schema.py: dimensions state, age, education, date
+    (PK entière) et tables de faits (education, employment, income, âges)
+    en columnstore partitionné par année. Les tables existantes sont gardées,
+    sauf reset=True qui supprime d'abord les tables education.
+    """
+    if reset:
+        drop_tables(engine, schema.EDUCATION_TABLES)
+    schema.create_all(engine)
 
-    with engine.begin() as conn:
-        conn.exec_driver_sql(DDL)
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Création des tables (design physique de schema.py).")
+    parser.add_argument("--reset", action="store_true",
+                        help="supprime puis recrée les tables education (dimensions et faits)")
+    args = parser.parse_args(argv)
+
+    # DDL: uniquement sur appel explicite, jamais à l'import
+    try:
+        create_tables(db.get_engine(), reset=args.reset)
+        print("Tables créées avec succès.")
+    except Exception as e:
+        print(f"Erreur lors de la création des tables : {e}")
 
-try:
-    create_tables(engine)
-    print("Tables créées avec succès.")
-except Exception as e:
-    print(f"Erreur lors de la création des tables : {e}")
 
-    ##
\ No newline at end of file
+if __name__ == "__main__":
+    main()
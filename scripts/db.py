@@ -0,0 +1,99 @@
+import os
+import threading
+import urllib.parse
+from typing import TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+# -------- CONFIG --------
+# Lue depuis l'environnement (ou un fichier .env, voir .env.example)
+SERVER = os.getenv("DB_SERVER", "localhost\\SQLEXPRESS")
+DATABASE = os.getenv("DB_NAME", "USA")
+DRIVER = os.getenv("DB_DRIVER", "ODBC Driver 17 for SQL Server")
+USER = os.getenv("DB_USER")              # absent -> authentification Windows
+PASSWORD = os.getenv("DB_PASSWORD", "")
+URL = os.getenv("DB_URL")                # URL SQLAlchemy complète (prioritaire)
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # secondes
+
+# -------- REGISTRE DES ENGINES --------
+# Un engine (et donc un pool) par URL, partagé par tous les loaders du process
+_engines = {}
+_lock = threading.Lock()
+
+
+def odbc_connect_string(server=None, database=None):
+    auth = f"UID={USER};PWD={PASSWORD};" if USER else "Trusted_Connection=yes;"
+    return (
+        f"DRIVER={{{DRIVER}}};"
+        f"SERVER={server or SERVER};"
+        f"DATABASE={database or DATABASE};"
+        f"{auth}"
+        "TrustServerCertificate=yes;"
+    )
+
+
+def database_url(server=None, database=None):
+    # DB_URL ne s'applique qu'à la base cible par défaut
+    if URL and server is None and database is None:
+        return URL
+    params = urllib.parse.quote_plus(odbc_connect_string(server, database))
+    return f"mssql+pyodbc:///?odbc_connect={params}"
+
+
+def get_engine(server=None, database=None) -> "Engine":
+    """
+    Engine poolé pour (server, database), créé au premier appel puis réutilisé.
+
+    pool_pre_ping écarte les connexions mortes avant de les rendre, et
+    pool_recycle les renouvelle avant les timeouts côté serveur.
+    """
+    return engine_for_url(database_url(server, database))
+
+
+def engine_for_url(url) -> "Engine":
+    # Même registre pour toute URL SQLAlchemy (ex: base SQLite locale des sinks)
+    # SQLAlchemy n'est importé qu'à la création du premier engine
+    from sqlalchemy import create_engine
+    from sqlalchemy.engine import make_url
+
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            backend = make_url(url)
+            options = {"pool_pre_ping": True, "pool_recycle": POOL_RECYCLE, "future": True}
+            # SQLite en mémoire: pool à connexion unique, pas de taille de pool
+            if not (backend.get_backend_name() == "sqlite" and backend.database in (None, "", ":memory:")):
+                options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+            if backend.get_backend_name() == "sqlite":
+                # écritures concurrentes (threads): attendre le verrou plutôt qu'échouer
+                options["connect_args"] = {"timeout": 60, "check_same_thread": False}
+            if backend.get_backend_name() == "mssql":
+                options["fast_executemany"] = True
+            engine = create_engine(url, **options)
+            _engines[url] = engine
+    return engine
+
+
+def connect(server=None, database=None):
+    # Connexion SQLAlchemy empruntée au pool (à utiliser avec `with`)
+    return get_engine(server, database).connect()
+
+
+def raw_connection(server=None, database=None):
+    # Connexion DB-API (pyodbc) du pool: close() la rend au pool
+    return get_engine(server, database).raw_connection()
+
+
+def dispose_engines():
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
@@ -1,12 +1,38 @@
 # -*- coding: utf-8 -*-
+import argparse
+import numpy as np
 import pandas as pd
 import os
 import glob
 import re
-from create_tables import make_engine_trusted
-
-
-def load_education_files(folder: str, pattern: str = "education_*.csv") -> pd.DataFrame:
+import acs_types
+import education_parser
+import labels
+from acs_types import read_acs_csv
+from education_parser import (AGE_GROUPS, AGE_SECTION, EARNINGS_EDUCATION, EARNINGS_POPULATION,
+                              EARNINGS_SECTION, duplicate_keys, emit_categories, is_earnings_section, parse_education)
+from labels import normalize_labels
+from manifest import PartitionCache, add_cache_arguments, build_partitions, code_version
+import sinks
+
+
+age_group_mapping = {
+    "Population 18 to 24 years": "18 to 24 years",
+    "Population 25 years and over":  "25 years and over",
+    "Population 25 to 34 years": "25 to 34 years",
+    "Population 35 to 44 years": "35 to 44 years",
+    "Population 45 to 64 years": "45 to 64 years",
+    "Population 65 years and over": "65 years and over",
+    "Population 25 years and over with earnings": "25 years and over"
+}
+
+
+# Fichiers annuels education_YYYY.csv seulement (pas les exports dérivés,
+# ex: education_2023_filtered.csv écrit par age_by_education.py)
+EDUCATION_FILE_PATTERN = "education_[0-9][0-9][0-9][0-9].csv"
+
+
+def load_education_files(folder: str, pattern: str = EDUCATION_FILE_PATTERN) -> pd.DataFrame:
     """
     Purpose:
         Read all CSV files matching a pattern from a folder, add the year from
@@ -14,7 +40,7 @@ def load_education_files(folder: str, pattern: str = "education_*.csv") -> pd.Da
 
     Parameters:
         folder (str): Path to the folder containing the CSV files.
-        pattern (str): Glob pattern to match files (default: 'education_*.csv').
+        pattern (str): Glob pattern to match files (default: yearly files 'education_YYYY.csv').
 
     Returns:
         pd.DataFrame: Concatenated DataFrame with a 'year' column.
@@ -30,7 +56,7 @@ def load_education_files(folder: str, pattern: str = "education_*.csv") -> pd.Da
     frames = []
     for path in files:
         try:
-            df = pd.read_csv(path)
+            df = read_acs_csv(path, "education", strip_labels=False)
             # Extract year from filename 'education_YYYY.csv'
             try:
                 name = os.path.splitext(os.path.basename(path))[0]
@@ -83,25 +109,31 @@ def build_dim_state(df: pd.DataFrame) -> pd.DataFrame:
     dim_state.index.name = "state_id"
     return dim_state
 
+# Libellés de niveaux d'études (filtre par mots-clés)
+EDUCATION_LEVEL_PATTERN = r"(?:graduate|diploma|college|associate|bachelor|professional|degree|9th|12th)"
+
+
+def is_education_level(labels: pd.Series) -> pd.Series:
+    return labels.str.contains(EDUCATION_LEVEL_PATTERN, case=False, regex=True)
+
+
 def build_dim_education(df: pd.DataFrame) -> pd.DataFrame:
     """
     Purpose:
-        Extract unique education level names from the 'Label (Grouping)' column
-        and return a dim_education_level table with a surrogate key index.
+        Extract unique education level names from the normalized labels (the
+        same labels as the fact tables) and return a dim_education_level table
+        with a surrogate key index.
 
     Parameters:
-        df (pd.DataFrame): Input DataFrame containing 'Label (Grouping)'.
+        df (pd.DataFrame): Input DataFrame containing 'Label (Grouping)' (or label_clean).
 
     Returns:
         pd.DataFrame: Index 'education_level_id' (starting at 1) and
                       one column 'education'.
     """
-    labels = df["Label (Grouping)"].astype(str).str.strip()
+    labels = df["label_clean"] if "label_clean" in df.columns else normalize_labels(df["Label (Grouping)"])
     # Keep rows that look like education levels (simple keyword filter)
-    mask = labels.str.contains(
-        r"(graduate|diploma|college|associate|bachelor|professional|degree|9th|12th)",
-        case=False, regex=True
-    )
+    mask = is_education_level(labels)
     levels = sorted(labels[mask].drop_duplicates())
     dim_edu = pd.DataFrame({"education": levels})
     dim_edu.index = range(1, len(dim_edu) + 1)
@@ -118,7 +150,7 @@ def build_dim_age(df: pd.DataFrame) -> pd.DataFrame:
         df (pd.DataFrame): Input DataFrame containing 'age_group'.
 
     Returns:
-        pd.DataFrame: one column 'age_group_name'
+        pd.DataFrame: Index 'age_id' (starting at 1) and one column 'age_group'.
     """
     ages = [
     "Under 5 years",
@@ -135,6 +167,8 @@ def build_dim_age(df: pd.DataFrame) -> pd.DataFrame:
     "75 years and over",
 ]
     dim_age = pd.DataFrame({"age_group": ages})
+    dim_age.index = range(1, len(dim_age) + 1)
+    dim_age.index.name = "age_id"
     return dim_age
 
 def build_dim_date(df: pd.DataFrame) -> pd.DataFrame:
@@ -146,102 +180,61 @@ def build_dim_date(df: pd.DataFrame) -> pd.DataFrame:
         df (pd.DataFrame): Source data with a 'year' column.
 
     Returns:
-        pd.DataFrame: index 'date_id' (1..n), columns ['year'].
+        pd.DataFrame: index 'date_id' (the year itself), columns ['year'].
     """
     years = sorted(pd.Series(df.get("year")).dropna().unique().tolist())
     dim = pd.DataFrame({"year": years})
-    dim.index = range(1, len(dim) + 1)
+    # date_id = année: clé stable d'un run à l'autre, et clé de partition des faits
+    dim.index = years
     dim.index.name = "date_id"
     return dim
 
-def clean(x: str) -> str:
-    if pd.isna(x):
-        return ""
-    return re.sub(r"\s+", " ", str(x).replace("\xa0"," ")).strip()
 
 
 
-def split_metric_col(col: str):
-    # attend: "<State>!!<Category>!!Estimate"
-    parts = col.split("!!")
-    if len(parts) >= 3 and parts[-1] == "Estimate":
-        state = parts[0].strip()
-        cat = "!!".join(parts[1:-1]).strip().lower()
-        cat = re.sub(r"\s+", " ", cat)
-        if cat in metric_map:
-            return state, metric_map[cat]
-    return None
-
 def convert_numeric(df_in: pd.DataFrame) -> pd.DataFrame:
     df = df_in.copy()
+    # Les colonnes déjà typées à la lecture (read_acs_csv) ne repassent pas
+    # par les conversions de chaînes
     # Remplacer (X) -> NA
     for col in ["total_percent","male_percent","female_percent",
                 "total_estimate","male_estimate","female_estimate"]:
-        if col in df.columns:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
             df[col] = df[col].replace("(X)", pd.NA)
 
     # % -> float [0..1]
     for col in ["total_percent","male_percent","female_percent"]:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.replace(",", "", regex=False).str.rstrip("%")
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(str).str.replace(",", "", regex=False).str.rstrip("%")
             df[col] = pd.to_numeric(df[col], errors="coerce") / 100
 
     # effectifs -> Int64
     for col in ["total_estimate","male_estimate","female_estimate"]:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.replace(",", "", regex=False)
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(str).str.replace(",", "", regex=False)
             df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
     return df
 
 
-def build_fact_age_by_education(df: pd.DataFrame) -> pd.DataFrame:
+def build_fact_age_by_education(df: pd.DataFrame, long: pd.DataFrame = None) -> pd.DataFrame:
     """
     Purpose:
         Build the fact table for age by education level.
 
     Parameters:
         df (pd.DataFrame): Input DataFrame containing education and age group information.
+        long (pd.DataFrame): Canonical long frame (parse_education(df)), parsed here if omitted.
 
     Returns:
         pd.DataFrame: Fact table with age and education level metrics.
     """
-    # -------- construire age_group (par année)
-    age_groups = [
-        "Population 18 to 24 years",
-        "Population 25 years and over",
-        "Population 25 to 34 years",
-        "Population 35 to 44 years",
-        "Population 45 to 64 years",
-        "Population 65 years and over",
-    ]
-    df["age_group"] = df["label_clean"].where(df["label_clean"].isin(age_groups))
-    df["age_group"] = df.groupby("year", group_keys=False)["age_group"].ffill()
+    long = parse_education(df) if long is None else long
 
-    # -------- supprimer entêtes
-    drop_labels = ["AGE BY EDUCATIONAL ATTAINMENT"] + age_groups
-    base = df[~df["label_clean"].isin(drop_labels)].copy()
-    base["education"] = base["label_clean"]
-
-    # -------- sélectionner colonnes métriques
-    selected_cols, tuples = [], []
-    for c in base.columns:
-        if "!!" in c:
-            info = split_metric_col(c)
-            if info is not None:
-                selected_cols.append(c)
-                tuples.append(info)
-
-    if not selected_cols:
-        raise RuntimeError("Aucune colonne métrique au format '<State>!!<Category>!!Estimate' n'a été trouvée.")
-
-    metrics_df = base[selected_cols].copy()
-    mi = pd.MultiIndex.from_tuples(tuples, names=["state", "metric"])
-    metrics_df.columns = mi
-
-    # -------- passer en long sur 'state' et recombiner
-    stacked = metrics_df.stack(level=0).reset_index(names=["row_id", "state"])
-    meta = base[["year", "education", "age_group"]].reset_index(names="row_id")
-    data = meta.merge(stacked, on="row_id", how="right").drop(columns=["row_id"])
+    # -------- supprimer entêtes et lignes hors niveaux d'études (races, populations)
+    drop_labels = [AGE_SECTION] + AGE_GROUPS
+    data = long[~long["education"].isin(drop_labels) & is_education_level(long["education"])].reset_index(drop=True)
 
     # -------- ordonner & typer (10 colonnes)
     cols_age = [
@@ -255,10 +248,6 @@ def build_fact_age_by_education(df: pd.DataFrame) -> pd.DataFrame:
         "female_estimate",
         "female_percent",
     ]
-    for c in cols_age:
-        if c not in data.columns:
-            data[c] = pd.NA
-
     data = data[cols_age]
     data["year"] = pd.to_numeric(data["year"], errors="coerce").astype("Int64")
     data = convert_numeric(data)
@@ -268,71 +257,44 @@ def build_fact_age_by_education(df: pd.DataFrame) -> pd.DataFrame:
 
     return data
 
-def build_fact_earning_by_education(df: pd.DataFrame) -> pd.DataFrame:
+
+def earnings_rows(long: pd.DataFrame) -> pd.DataFrame:
+    # Section "MEDIAN EARNINGS..." (toutes années): lignes d'éducation sous l'en-tête de population
+    in_section = is_earnings_section(long["section"])
+
+    # chaque année doit avoir sa section de revenus médians
+    years = long["year"] if "year" in long.columns else pd.Series(0, index=long.index)
+    has_earnings = in_section.groupby(years).any()
+    if not has_earnings.all():
+        missing = ", ".join(map(str, has_earnings.index[~has_earnings]))
+        raise RuntimeError(f"Section '{EARNINGS_SECTION} ...' introuvable (année(s): {missing}).")
+
+    mask = (
+        in_section
+        & long["education"].isin(EARNINGS_EDUCATION)
+        & (long["population"] == EARNINGS_POPULATION)
+    )
+    data = long[mask].reset_index(drop=True)
+    data["age_group"] = data["population"]
+    return data
+
+
+def build_fact_earning_by_education(df: pd.DataFrame, long: pd.DataFrame = None) -> pd.DataFrame:
     """
     Purpose:
         Build the fact table for earnings by education level.
 
     Parameters:
         df (pd.DataFrame): Input DataFrame containing education and earnings information.
-        dim_age (pd.DataFrame): Dimension table for age groups.
-        dim_education (pd.DataFrame): Dimension table for education levels.
+        long (pd.DataFrame): Canonical long frame (parse_education(df)), parsed here if omitted.
 
     Returns:
         pd.DataFrame: Fact table with earnings and education level metrics.
     """
-    
-    # ---------- délimitation de la section "MEDIAN EARNINGS..."
-    SECTION_HDR = "MEDIAN EARNINGS IN THE PAST 12 MONTHS (IN 2023 INFLATION-ADJUSTED DOLLARS)"
-    AGE_HDR = "Population 25 years and over with earnings"
-    EDU_ROWS = [
-        "Less than high school graduate",
-        "High school graduate (includes equivalency)",
-        "Some college or associate's degree",
-        "Bachelor's degree",
-        "Graduate or professional degree",
-    ]
-
-    # baliser la section par année
-    df["section"] = df["label_clean"].where(df["label_clean"] == SECTION_HDR)
-    df["section"] = df.groupby("year", group_keys=False)["section"].ffill()
-
-    sec = df[df["section"] == SECTION_HDR].copy()
-
-    # construire age_group (uniquement l'en-tête demandé)
-    sec["age_group"] = sec["label_clean"].where(sec["label_clean"] == AGE_HDR)
-    sec["age_group"] = sec.groupby("year", group_keys=False)["age_group"].ffill()
-
-    # ne garder que les lignes d'éducation sous cet age_group
-    base = sec[
-        sec["label_clean"].isin(EDU_ROWS) & (sec["age_group"] == AGE_HDR)
-    ].copy()
-    base["education"] = base["label_clean"]
-
-    # ---------- sélectionner colonnes métriques (états)
-    selected_cols, tuples = [], []
-    for c in base.columns:
-        if "!!" in c:
-            info = split_metric_col(c)
-            if info is not None:
-                selected_cols.append(c)
-                tuples.append(info)
-
-    if not selected_cols:
-        raise RuntimeError(
-            "Aucune colonne métrique au format '<State>!!<Category>!!Estimate' n'a été trouvée."
-        )
+    long = parse_education(df) if long is None else long
+    earning_by_education = earnings_rows(long)
 
-    metrics_df = base[selected_cols].copy()
-    mi = pd.MultiIndex.from_tuples(tuples, names=["state", "metric"])
-    metrics_df.columns = mi
-
-    # ---------- passage en long sur 'state' et recombinaison
-    stacked = metrics_df.stack(level=0).reset_index(names=["row_id", "state"])
-    meta = base[["year", "education", "age_group"]].reset_index(names="row_id")
-    earning_by_education = meta.merge(stacked, on="row_id", how="right").drop(columns=["row_id"])
-
-    # ---------- ordonner & typer (10 colonnes)
+    # ---------- ordonner & typer (7 colonnes)
     cols = [
         "state", "year",
         "education",
@@ -341,210 +303,243 @@ def build_fact_earning_by_education(df: pd.DataFrame) -> pd.DataFrame:
         "male_estimate",
         "female_estimate"
     ]
-    for c in cols:
-        if c not in earning_by_education.columns:
-            earning_by_education[c] = pd.NA
-
     earning_by_education = earning_by_education[cols]
     earning_by_education["year"] = pd.to_numeric(earning_by_education["year"], errors="coerce").astype("Int64")
     earning_by_education = convert_numeric(earning_by_education)
 
     earning_by_education['age_group'] = earning_by_education['age_group'].replace(age_group_mapping)
-    earning_by_education.to_csv("earning_by_education.csv", index=False)
     return earning_by_education
 
-def age_by_education_new(df: pd.DataFrame) -> pd.DataFrame:
+def age_by_education_new(df: pd.DataFrame, long: pd.DataFrame = None) -> pd.DataFrame:
     """
     Purpose:
         Build the fact table for age by education level with 7 columns.
 
     Parameters:
         df (pd.DataFrame): Input DataFrame containing education and age group information.
+        long (pd.DataFrame): Canonical long frame (parse_education(df)), parsed here if omitted.
 
     Returns:
         pd.DataFrame: Fact table with 7 columns: state, year, education, age_group, category, estimate, percent.
     """
-    # -------- construire age_group (par année)
-    age_groups = [
-        "Population 18 to 24 years",
-        "Population 25 years and over",
-        "Population 25 to 34 years",
-        "Population 35 to 44 years",
-        "Population 45 to 64 years",
-        "Population 65 years and over",
-    ]
-    df["age_group"] = df["label_clean"].where(df["label_clean"].isin(age_groups))
-    df["age_group"] = df.groupby("year", group_keys=False)["age_group"].ffill()
+    long = parse_education(df) if long is None else long
 
     # -------- supprimer entêtes
-    drop_labels = ["AGE BY EDUCATIONAL ATTAINMENT"] + age_groups
-    base = df[~df["label_clean"].isin(drop_labels)].copy()
-    base["education"] = base["label_clean"]
-
-    # -------- sélectionner colonnes métriques
-    selected_cols, tuples = [], []
-    for c in base.columns:
-        if "!!" in c:
-            info = split_metric_col(c)
-            if info is not None:
-                selected_cols.append(c)
-                tuples.append(info)
-
-    if not selected_cols:
-        raise RuntimeError("Aucune colonne métrique au format '<State>!!<Category>!!Estimate' n'a été trouvée.")
-
-    metrics_df = base[selected_cols].copy()
-    mi = pd.MultiIndex.from_tuples(tuples, names=["state", "metric"])
-    metrics_df.columns = mi
-
-    # -------- passer en long sur 'state' et recombiner
-    stacked = metrics_df.stack(level=0).reset_index(names=["row_id", "state"])
-    meta = base[["year", "education", "age_group"]].reset_index(names="row_id")
-    data = meta.merge(stacked, on="row_id", how="right").drop(columns=["row_id"])
-
-    # -------- transformer en 7 colonnes
-    data = data.melt(
-        id_vars=["state", "year", "education", "age_group"],
-        value_vars=["total_estimate", "male_estimate", "female_estimate", "total_percent", "male_percent", "female_percent"],
-        var_name="metric",
-        value_name="value"
-    )
-    data["category"] = data["metric"].str.extract(r"(total|male|female)")
-    data["metric"] = data["metric"].str.extract(r"(estimate|percent)")
+    drop_labels = [AGE_SECTION] + AGE_GROUPS
+    data = long[~long["education"].isin(drop_labels)]
 
-    # -------- vérifier et gérer les doublons
-    duplicate_check = data.duplicated(subset=["state", "year", "education", "age_group", "category", "metric"], keep=False)
-    if duplicate_check.any():
-        print("Des doublons ont été détectés. Les valeurs seront agrégées.")
-        data = data.groupby(["state", "year", "education", "age_group", "category", "metric"], as_index=False).mean()
+    # -------- émettre directement les 7 colonnes (catégorie connue par les en-têtes)
+    keys = ["state", "year", "education", "age_group", "category"]
+    data = emit_categories(data, keys[:-1])
 
-    # -------- pivoter les données
-    data = data.pivot(index=["state", "year", "education", "age_group", "category"], columns="metric", values="value").reset_index()
+    # -------- vérifier et gérer les doublons (hash des clés, agrégation des seuls doublons)
+    duplicates = duplicate_keys(data, keys)
+    if duplicates.any():
+        print("Des doublons ont été détectés. Les valeurs seront agrégées.")
+        merged = data[duplicates].groupby(keys, as_index=False, sort=False).mean()
+        data = pd.concat([data[~duplicates], merged], ignore_index=True)
 
-    data = data.rename(columns={"estimate": "estimate", "percent": "percent"})
+    # -------- ordre des clés (celui de l'ancien pivot)
+    data = data.sort_values(keys, ignore_index=True)
     data["year"] = pd.to_numeric(data["year"], errors="coerce").astype("Int64")
-    data = convert_numeric(data)
 
     data['age_group'] = data['age_group'].replace(age_group_mapping)
 
     return data
 
 
-def earning_by_education_new(df: pd.DataFrame) -> pd.DataFrame:
+def earning_by_education_new(df: pd.DataFrame, long: pd.DataFrame = None) -> pd.DataFrame:
     """
     Purpose:
         Build the fact table for earnings by education level with 7 columns.
 
     Parameters:
         df (pd.DataFrame): Input DataFrame containing education and earnings information.
+        long (pd.DataFrame): Canonical long frame (parse_education(df)), parsed here if omitted.
 
     Returns:
         pd.DataFrame: Fact table with 7 columns: state, year, education, age_group, category, estimate, percent.
     """
-    SECTION_HDR = "MEDIAN EARNINGS IN THE PAST 12 MONTHS (IN 2023 INFLATION-ADJUSTED DOLLARS)"
-    AGE_HDR = "Population 25 years and over with earnings"
-    EDU_ROWS = [
-        "Less than high school graduate",
-        "High school graduate (includes equivalency)",
-        "Some college or associate's degree",
-        "Bachelor's degree",
-        "Graduate or professional degree",
-    ]
+    long = parse_education(df) if long is None else long
+    data = earnings_rows(long)
 
-    # baliser la section par année
-    df["section"] = df["label_clean"].where(df["label_clean"] == SECTION_HDR)
-    df["section"] = df.groupby("year", group_keys=False)["section"].ffill()
-
-    sec = df[df["section"] == SECTION_HDR].copy()
-
-    # construire age_group (uniquement l'en-tête demandé)
-    sec["age_group"] = sec["label_clean"].where(sec["label_clean"] == AGE_HDR)
-    sec["age_group"] = sec.groupby("year", group_keys=False)["age_group"].ffill()
-
-    # ne garder que les lignes d'éducation sous cet age_group
-    base = sec[
-        sec["label_clean"].isin(EDU_ROWS) & (sec["age_group"] == AGE_HDR)
-    ].copy()
-    base["education"] = base["label_clean"]
-
-    # sélectionner colonnes métriques (états)
-    selected_cols, tuples = [], []
-    for c in base.columns:
-        if "!!" in c:
-            info = split_metric_col(c)
-            if info is not None:
-                selected_cols.append(c)
-                tuples.append(info)
-
-    if not selected_cols:
-        raise RuntimeError(
-            "Aucune colonne métrique au format '<State>!!<Category>!!Estimate' n'a été trouvée."
-        )
-
-    metrics_df = base[selected_cols].copy()
-    mi = pd.MultiIndex.from_tuples(tuples, names=["state", "metric"])
-    metrics_df.columns = mi
-
-    # passage en long sur 'state' et recombinaison
-    stacked = metrics_df.stack(level=0).reset_index(names=["row_id", "state"])
-    meta = base[["year", "education", "age_group"]].reset_index(names="row_id")
-    data = meta.merge(stacked, on="row_id", how="right").drop(columns=["row_id"])
-
-    # transformer en 7 colonnes
-    data = data.melt(
-        id_vars=["state", "year", "education", "age_group"],
-        value_vars=["total_estimate", "male_estimate", "female_estimate"],
-        var_name="metric",
-        value_name="estimate"
-    )
-    data["category"] = data["metric"].str.extract(r"(total|male|female)")
+    # émettre directement les 7 colonnes (estimations seulement)
+    data = emit_categories(data, ["state", "year", "education", "age_group"], measures=("estimate",),
+                           category_major=True)
     data["percent"] = pd.NA  # No percent column in this dataset
-    data = data[["state", "year", "education", "age_group", "category", "estimate", "percent"]]
 
     data["year"] = pd.to_numeric(data["year"], errors="coerce").astype("Int64")
-    data = convert_numeric(data)
 
     data['age_group'] = data['age_group'].replace(age_group_mapping)
 
     return data
 
 
-df = load_education_files("education")
+FACT_BUILDERS = {
+    "age_by_education": build_fact_age_by_education,
+    "earning_by_education": build_fact_earning_by_education,
+}
+
+
+# -------- CLES DE SUBSTITUTION --------
+# colonne naturelle du fait -> (dimension, colonne de la dimension, clé étrangère)
+FACT_KEYS = {
+    "state": ("state", "state_name", "state_id"),
+    "year": ("date", "year", "date_id"),
+    "education": ("education", "education", "education_id"),
+    "age_group": ("age", "age_group", "age_id"),
+}
 
-if __name__ == "__main__":
-    # Charger les données
-    df = load_education_files("education")
-
-    # Générer les dimensions
-    dim_state = build_dim_state(df)
-    dim_education = build_dim_education(df)
-    dim_age = build_dim_age(df)
-    dim_date = build_dim_date(df)
-
-    # Générer les facts
-    metric_map = {
-    "total": "total_estimate",
-    "percent": "total_percent",
-    "male": "male_estimate",
-    "percent male": "male_percent",
-    "female": "female_estimate",
-    "percent female": "female_percent",
-    }
 
-    age_group_mapping = {
-        "Population 18 to 24 years": "18 to 24 years",
-        "Population 25 years and over":  "25 years and over",
-        "Population 25 to 34 years": "25 to 34 years",
-        "Population 35 to 44 years": "35 to 44 years",
-        "Population 45 to 64 years": "45 to 64 years",
-        "Population 65 years and over": "65 years and over",
-        "Population 25 years and over with earnings": "25 years and over"
+def build_dims(df: pd.DataFrame) -> dict:
+    return {
+        "state": build_dim_state(df),
+        "education": build_dim_education(df),
+        "age": build_dim_age(df),
+        "date": build_dim_date(df),
     }
-    label_col = "Label (Grouping)"
-    df["label_clean"] = df[label_col].map(clean)
 
-    fact_age_by_education = build_fact_age_by_education(df)
-    fact_earning_by_education = build_fact_earning_by_education(df)
+
+def encode_fact(fact: pd.DataFrame, dims: dict) -> pd.DataFrame:
+    """
+    Purpose:
+        Replace the natural keys of a fact table (state, year, education,
+        age_group) by the integer surrogate keys of the dimensions, through
+        one hash lookup per key column (pd.Index.get_indexer). A value with
+        no dimension member could not satisfy the foreign keys: the fact
+        builders only emit dimension members, so any such row raises.
+
+    Parameters:
+        fact (pd.DataFrame): Fact table with natural keys.
+        dims (dict): Dimensions indexed by their surrogate key (build_dims).
+
+    Returns:
+        pd.DataFrame: state_id, date_id, education_id, age_id (int32) and
+        the measure columns of the fact.
+    """
+    keys = {}
+    for col, (dim_name, natural, key) in FACT_KEYS.items():
+        dim = dims[dim_name]
+        positions = pd.Index(dim[natural]).get_indexer(fact[col])
+        missing = positions < 0
+        if missing.any():
+            unknown = sorted(fact.loc[missing, col].astype(str).unique())
+            raise ValueError(f"{missing.sum()} ligne(s) sans {key} (absent(s) de dim {dim_name}): {unknown}")
+        keys[key] = dim.index.to_numpy(dtype=np.int32)[positions]
+
+    measures = fact.drop(columns=list(FACT_KEYS))
+    return pd.concat([pd.DataFrame(keys, index=fact.index), measures], axis=1).reset_index(drop=True)
+
+
+def education_year_of(path: str) -> int:
+    name = os.path.splitext(os.path.basename(path))[0]
+    return int(name.split("_")[-1])
+
+
+def build_year_facts(path: str) -> dict:
+    """
+    Purpose:
+        Build every fact table for a single education_YYYY.csv file
+        (one partition per fact table and year).
+
+    Parameters:
+        path (str): Path to the yearly CSV file.
+
+    Returns:
+        dict: {fact table name: DataFrame}.
+    """
+    df = load_education_files(os.path.dirname(path), os.path.basename(path))
+    df["label_clean"] = normalize_labels(df["Label (Grouping)"])
+    # Un seul parsing (sections + passage en long) partagé par toutes les tables de faits
+    long = parse_education(df)
+    return {name: builder(df, long) for name, builder in FACT_BUILDERS.items()}
+
+
+def build_year_fact(path: str, name: str) -> dict:
+    return {name: build_year_facts(path)[name]}
+
+
+def build_facts_incremental(folder: str, full_rebuild: bool = False) -> dict:
+    """
+    Purpose:
+        Build the fact tables year by year, recomputing only the years whose
+        source file (or the parsing code) changed since the last run; the other
+        years are reused from the local partition cache.
+
+    Parameters:
+        folder (str): Folder containing the education_YYYY.csv files.
+        full_rebuild (bool): Ignore the cache and recompute every year.
+
+    Returns:
+        dict: {fact table name: DataFrame with all years concatenated}.
+    """
+    files = sorted(glob.glob(os.path.join(folder, EDUCATION_FILE_PATTERN)), key=education_year_of)
+    if not files:
+        raise FileNotFoundError(f"No files found matching '{EDUCATION_FILE_PATTERN}' in {os.path.abspath(folder)}")
+    # Version du cache: ce module et le parser partagé (avec sa lecture typée et ses libellés)
+    version = code_version(__file__, education_parser.__file__, labels.__file__, acs_types.__file__)
+    cache = PartitionCache("education", version, enabled=not full_rebuild)
+    partitions = build_partitions(
+        files, list(FACT_BUILDERS), education_year_of, build_year_facts, build_year_fact, cache
+    )
+    return {name: pd.concat(frames, ignore_index=True) for name, frames in partitions.items()}
+
+
+def load_star(engine, dims: dict, facts: dict) -> None:
+    """
+    Purpose:
+        Load the education star schema into pre-created tables (schema.py:
+        PK / FK, fact tables as year-partitioned columnstore). The tables are
+        emptied then filled, dimensions first and facts second; they are
+        never dropped.
+
+    Parameters:
+        engine: SQLAlchemy engine (SQL Server, or SQLite for local runs).
+        dims (dict): Dimensions indexed by their surrogate key (build_dims).
+        facts (dict): Fact tables with integer keys (encode_fact).
+    """
+    import schema
+
+    schema.create_all(engine, schema.EDUCATION_TABLES)
+    schema.clear(engine, schema.EDUCATION_TABLES)
+    tables = [
+        ("date", dims["date"], True),
+        ("state", dims["state"], True),
+        ("education", dims["education"], True),
+        ("age", dims["age"], True),
+        ("age_by_education", facts["age_by_education"], False),
+        ("earning_by_education", facts["earning_by_education"], False),
+    ]
+    for name, frame, index in tables:
+        frame.to_sql(
+            name,
+            con=engine,
+            schema="dbo" if engine.dialect.name == "mssql" else None,
+            if_exists="append",
+            index=index,
+            chunksize=10000,
+            method=None
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dimensions et faits education.")
+    parser.add_argument("--education-dir", default="education", help="dossier des fichiers education_YYYY.csv")
+    add_cache_arguments(parser)
+    sinks.add_sink_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # Charger les données
+    df = load_education_files(args.education_dir)
+
+    # Générer les dimensions (clés de substitution)
+    dims = build_dims(df)
+
+    # Générer les facts (seules les années modifiées sont recalculées)
+    facts = build_facts_incremental(args.education_dir, full_rebuild=args.full_rebuild)
+    fact_age_by_education = facts["age_by_education"]
+    fact_earning_by_education = facts["earning_by_education"]
+    fact_earning_by_education.to_csv("earning_by_education.csv", index=False)
 
     # age_by_education_new=age_by_education_new(df)
     # earning_by_education_new=earning_by_education_new(df)
@@ -554,76 +549,27 @@ if __name__ == "__main__":
 
 
     # Sauvegarder les DataFrames en CSV
-    # dim_state.to_csv("dim_state.csv")
-    # dim_education.to_csv("dim_education.csv")
-    # dim_age.to_csv("dim_age.csv")
+    # dims["state"].to_csv("dim_state.csv")
+    # dims["education"].to_csv("dim_education.csv")
+    # dims["age"].to_csv("dim_age.csv")
     # fact_age_by_education.to_csv("fact_age_by_education.csv", index=False)
     # fact_earning_by_education.to_csv("fact_earning_by_education.csv", index=False)
 
 
 
-    # # Ecriture dans la db
-    SERVER   = r"localhost\SQLEXPRESS"
-    DATABASE = "USA"
-    engine = make_engine_trusted(SERVER, DATABASE)
-
-
-    dim_date.to_sql(
-        "date",
-        con=engine,
-        schema="dbo",
-        if_exists="replace",
-        index=True,
-        chunksize=10000,
-        method=None
-    )
-
-    dim_state.to_sql(
-        "state",
-        con=engine,
-        schema="dbo",
-        if_exists="replace",
-        index=True,
-        chunksize=10000,
-        method=None
-    )
+    # Clés étrangères entières à la place des libellés (après concaténation des
+    # partitions: les ids restent ceux des dimensions de ce run)
+    fact_age_by_education = encode_fact(fact_age_by_education, dims)
+    fact_earning_by_education = encode_fact(fact_earning_by_education, dims)
 
-    dim_education.to_sql(
-        "education",
-        con=engine,
-        schema="dbo",
-        if_exists="replace",
-        index=True,
-        chunksize=10000,
-        method=None
-    )
+    # # Ecriture dans la db (cible lue dans .env / l'environnement, ou SQLite avec --sink sqlite)
+    sink = sinks.get_sink(args.sink, args.sqlite_path, args.batch_size)
 
-    dim_age.to_sql(
-        "age",
-        con=engine,
-        schema="dbo",
-        if_exists="replace",
-        index=False,
-        chunksize=10000,
-        method=None
-    )
+    load_star(sink.engine, dims, {
+        "age_by_education": fact_age_by_education,
+        "earning_by_education": fact_earning_by_education,
+    })
 
-    fact_age_by_education.to_sql(
-        "age_by_education",
-        con=engine,
-        schema="dbo",
-        if_exists="replace",
-        index=False,
-        chunksize=10000,
-        method=None
-    )
 
-    fact_earning_by_education.to_sql(
-        "earning_by_education",
-        con=engine,
-        schema="dbo",
-        if_exists="replace",
-        index=False,
-        chunksize=10000,
-        method=None
-    )
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from labels import as_text, normalize_labels
+
+# -------- COLONNES METRIQUES --------
+# "<State>!!<Category>!!Estimate": catégorie ACS -> métrique
+metric_map = {
+    "total": "total_estimate",
+    "percent": "total_percent",
+    "male": "male_estimate",
+    "percent male": "male_percent",
+    "female": "female_estimate",
+    "percent female": "female_percent",
+}
+METRICS = list(metric_map.values())
+
+# métrique -> (catégorie, mesure), connu dès les en-têtes (pas de regex par ligne)
+METRIC_PARTS = {metric: tuple(metric.split("_")) for metric in METRICS}
+CATEGORIES = list(dict.fromkeys(category for category, _ in METRIC_PARTS.values()))
+
+# -------- SECTIONS ET EN-TETES --------
+AGE_SECTION = "AGE BY EDUCATIONAL ATTAINMENT"
+AGE_GROUPS = [
+    "Population 18 to 24 years",
+    "Population 25 years and over",
+    "Population 25 to 34 years",
+    "Population 35 to 44 years",
+    "Population 45 to 64 years",
+    "Population 65 years and over",
+]
+
+# En-tête suivi de "(IN <année> INFLATION-ADJUSTED DOLLARS)": l'année change
+# à chaque fichier, la section est reconnue sur ce préfixe
+EARNINGS_SECTION = "MEDIAN EARNINGS IN THE PAST 12 MONTHS"
+EARNINGS_POPULATION = "Population 25 years and over with earnings"
+EARNINGS_EDUCATION = [
+    "Less than high school graduate",
+    "High school graduate (includes equivalency)",
+    "Some college or associate's degree",
+    "Bachelor's degree",
+    "Graduate or professional degree",
+]
+
+
+@lru_cache(maxsize=None)
+def split_metric_col(col: str):
+    # attend: "<State>!!<Category>!!Estimate"
+    parts = col.split("!!")
+    if len(parts) >= 3 and parts[-1] == "Estimate":
+        state = parts[0].strip()
+        cat = "!!".join(parts[1:-1]).strip().lower()
+        cat = re.sub(r"\s+", " ", cat)
+        if cat in metric_map:
+            return state, metric_map[cat]
+    return None
+
+
+def column_plan(tuples):
+    """
+    Plan du passage en long à partir des en-têtes (state, metric):
+    états triés (ordre de l'ancien stack), métriques dans l'ordre d'apparition,
+    et grid[état, métrique] = position de la colonne (-1 si absente).
+    """
+    states = sorted({state for state, _ in tuples})
+    metrics = list(dict.fromkeys(metric for _, metric in tuples))
+    state_pos = {state: i for i, state in enumerate(states)}
+    metric_pos = {metric: i for i, metric in enumerate(metrics)}
+
+    grid = np.full((len(states), len(metrics)), -1, dtype=np.intp)
+    for j, (state, metric) in enumerate(tuples):
+        grid[state_pos[state], metric_pos[metric]] = j
+    return states, metrics, grid
+
+
+def reshape_states(values: np.ndarray, states, metrics, grid):
+    """
+    Noyau large -> long, sans stack ni jointure.
+
+    values: bloc (lignes x colonnes métriques) dans l'ordre des tuples.
+    Les sentinelles ACS sont déjà NaN à la lecture (read_acs_csv): seules les
+    lignes vides pour tous les états (en-têtes de section) sont écartées, les
+    couples (ligne, état) sans aucune valeur sont gardés. Retourne (positions des lignes gardées,
+    bloc long (lignes gardées x états, métriques)): la ligne i du bloc long
+    correspond à la ligne source kept[i // len(states)] et à l'état
+    states[i % len(states)].
+    """
+    kept = np.flatnonzero(~pd.isna(values).all(axis=1))
+    values = values[kept]
+
+    if (grid < 0).any():
+        # couple (état, métrique) absent: colonne de NaN ajoutée en dernier
+        filler = np.full((len(values), 1), np.nan, dtype=values.dtype if values.dtype == object else np.float64)
+        values = np.concatenate([values, filler], axis=1)
+        grid = np.where(grid < 0, values.shape[1] - 1, grid)
+
+    # (lignes, états x métriques) -> (lignes x états, métriques): une seule copie
+    block = values[:, grid.ravel()].reshape(len(kept) * len(states), len(metrics))
+    return kept, block
+
+
+def is_earnings_section(sections: pd.Series) -> pd.Series:
+    return sections.str.startswith(EARNINGS_SECTION, na=False)
+
+
+def tag_sections(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Purpose:
+        Tag every row with its context, in a single pass per year:
+        section (last upper-case header), age_group (last AGE_GROUPS header)
+        and population (last earnings population header within the section).
+
+    Parameters:
+        df (pd.DataFrame): Wide education frame with label_clean (and year).
+
+    Returns:
+        pd.DataFrame: section / age_group / population, aligned on df.index.
+    """
+    labels = df["label_clean"]
+    years = df["year"] if "year" in df.columns else pd.Series(0, index=df.index)
+
+    tags = pd.DataFrame({
+        "section": labels.where(labels.str.isupper()),
+        "age_group": labels.where(labels.isin(AGE_GROUPS)),
+    }, index=df.index)
+    tags = tags.groupby(years).ffill()
+
+    population = labels.where(labels == EARNINGS_POPULATION)
+    tags["population"] = population.groupby([years, tags["section"]], observed=True).ffill()
+    return tags
+
+
+def parse_education(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Purpose:
+        Parse the wide education table once into its canonical long form:
+        one row per (source row, state) with the section tags and the six
+        metrics. Every fact table is then a filter / projection of it.
+
+    Parameters:
+        df (pd.DataFrame): Wide education frame (label_clean is added if missing).
+
+    Returns:
+        pd.DataFrame: row_id, year, education, section, age_group, population,
+        state and the metric columns (METRICS).
+    """
+    if "label_clean" not in df.columns:
+        df = df.assign(label_clean=normalize_labels(df["Label (Grouping)"]))
+
+    # -------- sélectionner colonnes métriques
+    selected_cols, tuples = [], []
+    for c in df.columns:
+        if "!!" in c:
+            info = split_metric_col(c)
+            if info is not None:
+                selected_cols.append(c)
+                tuples.append(info)
+
+    if not selected_cols:
+        raise RuntimeError("Aucune colonne métrique au format '<State>!!<Category>!!Estimate' n'a été trouvée.")
+
+    # -------- passer en long sur 'state' (noyau numpy) et recombiner avec le contexte
+    states, metrics, grid = column_plan(tuples)
+    kept, block = reshape_states(df[selected_cols].to_numpy(), states, metrics, grid)
+    take = np.repeat(kept, len(states))
+
+    meta = tag_sections(df)
+    meta.insert(0, "education", df["label_clean"])
+    if "year" in df.columns:
+        meta.insert(0, "year", df["year"])
+    meta = as_text(meta)
+
+    # bloc de métriques repris tel quel (sans recopie), contexte inséré devant
+    data = pd.DataFrame(block, columns=metrics)
+    data.insert(0, "state", np.tile(np.array(states, dtype=object), len(kept)))
+    for i, c in enumerate(["row_id"] + list(meta.columns)):
+        source = df.index.to_numpy() if c == "row_id" else meta[c].to_numpy()
+        data.insert(i, c, source[take])
+
+    for c in METRICS:
+        if c not in data.columns:
+            data[c] = pd.NA
+    return data
+
+
+def emit_categories(long: pd.DataFrame, keys, measures=("estimate", "percent"), category_major=False) -> pd.DataFrame:
+    """
+    Purpose:
+        Emit the (keys, category, measures) layout directly from the canonical
+        long frame: one row per source row and category, the measures of a
+        category being read from its metric columns (METRIC_PARTS). No melt /
+        regex / pivot detour, a single copy of the value block per measure.
+
+    Parameters:
+        long (pd.DataFrame): Canonical long frame (parse_education), possibly filtered.
+        keys (list): Context columns carried over (ex: state, year, education, age_group).
+        measures (tuple): Measures emitted as columns (estimate, percent).
+        category_major (bool): Order rows category by category (melt order)
+            instead of source row by source row.
+
+    Returns:
+        pd.DataFrame: keys, category and one column per measure.
+    """
+    n, n_cat = len(long), len(CATEGORIES)
+    by_parts = {parts: metric for metric, parts in METRIC_PARTS.items()}
+    # (lignes, catégories) -> une ligne par couple, dans l'ordre demandé
+    order = "F" if category_major else "C"
+    spread, cycle = (np.tile, np.repeat) if category_major else (np.repeat, np.tile)
+
+    data = {key: spread(long[key].to_numpy(), n_cat) for key in keys}
+    data["category"] = cycle(np.array(CATEGORIES, dtype=object), n)
+    for measure in measures:
+        block = long[[by_parts[category, measure] for category in CATEGORIES]]
+        data[measure] = block.to_numpy(dtype="float64", na_value=np.nan).ravel(order=order)
+    return pd.DataFrame(data)
+
+
+def duplicate_keys(data: pd.DataFrame, keys) -> pd.Series:
+    # Doublons repérés sur un hash 64 bits des clés (pas de groupby complet)
+    hashed = pd.util.hash_pandas_object(data[keys], index=False)
+    return pd.Series(hashed.duplicated(keep=False).to_numpy(), index=data.index)
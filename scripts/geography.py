@@ -0,0 +1,81 @@
+import pandas as pd
+
+
+# -------- REGIONS DU CENSUS --------
+REGIONS = {
+    "Northeast": [
+        "Connecticut", "Maine", "Massachusetts", "New Hampshire", "Rhode Island", "Vermont",
+        "New Jersey", "New York", "Pennsylvania",
+    ],
+    "Midwest": [
+        "Illinois", "Indiana", "Michigan", "Ohio", "Wisconsin",
+        "Iowa", "Kansas", "Minnesota", "Missouri", "Nebraska", "North Dakota", "South Dakota",
+    ],
+    "South": [
+        "Delaware", "District of Columbia", "Florida", "Georgia", "Maryland", "North Carolina",
+        "South Carolina", "Virginia", "West Virginia",
+        "Alabama", "Kentucky", "Mississippi", "Tennessee",
+        "Arkansas", "Louisiana", "Oklahoma", "Texas",
+    ],
+    "West": [
+        "Arizona", "Colorado", "Idaho", "Montana", "Nevada", "New Mexico", "Utah", "Wyoming",
+        "Alaska", "California", "Hawaii", "Oregon", "Washington",
+    ],
+}
+
+
+def add_geography_arguments(parser):
+    parser.add_argument("--states", default=None,
+                        help="liste d'états séparés par des virgules (ex: 'Alabama,Texas')")
+    parser.add_argument("--region", default=None, choices=sorted(REGIONS),
+                        help="ne traiter que les états d'une région du Census")
+    return parser
+
+
+def resolve_geographies(states=None, region=None):
+    # None = pas de filtre (toutes les géographies du fichier)
+    if not states and not region:
+        return None
+    selected = []
+    if states:
+        selected += [s.strip() for s in states.split(",") if s.strip()]
+    if region:
+        if region not in REGIONS:
+            raise ValueError(f"Région inconnue: {region} (attendu: {', '.join(sorted(REGIONS))})")
+        selected += REGIONS[region]
+    return list(dict.fromkeys(selected))
+
+
+# -------- PROJECTION DES COLONNES --------
+def scan_header(file_path):
+    # Lecture de l'en-tête seul, sans parser les données
+    return list(pd.read_csv(file_path, nrows=0).columns)
+
+
+def geo_column_map(columns, suffixes=None):
+    # geo -> positions de ses colonnes '<geo>!!...!!<suffixe>', en un seul
+    # passage sur l'en-tête (suffixes=None: toutes les colonnes '!!')
+    mapping = {}
+    for pos, col in enumerate(columns):
+        if "!!" not in col:
+            continue
+        parts = col.split("!!")
+        if suffixes is None or parts[-1] in suffixes:
+            mapping.setdefault(parts[0], []).append(pos)
+    return mapping
+
+
+def project_columns(file_path, geographies=None, suffixes=None):
+    # Positions à passer à read_csv(usecols=...) : le label + les colonnes
+    # des géographies demandées, dans l'ordre du fichier.
+    mapping = geo_column_map(scan_header(file_path), suffixes)
+    if geographies is None:
+        selected = list(mapping)
+    else:
+        wanted = set(geographies)
+        selected = [geo for geo in mapping if geo in wanted]
+        missing = wanted.difference(mapping)
+        if missing:
+            print(f"⚠️ Géographies absentes de {file_path}: {', '.join(sorted(missing))}")
+    usecols = [0] + [pos for geo in selected for pos in mapping[geo]]
+    return sorted(usecols), selected
@@ -1,50 +1,112 @@
-import pandas as pd
-from sqlalchemy import create_engine, Integer, Float, String, MetaData, Table, Column
+import argparse
+import sys
+
 import clean_csv
-from dotenv import load_dotenv
-import os
 import create_and_insert_table_ages
+import db
+import sinks
+import staging
+from parallel import resolve_workers, run_threads
+
 
-load_dotenv()
+# -------- CIBLES --------
+# Tables indépendantes: chacune peut être chargée par un thread différent
+TABLES = [
+    "class_of_worker",
+    "commuting_to_work",
+    "employment_status",
+    "health_insurance",
+    "industry",
+    "occupation",
+    "poverty",
+]
+AGE_YEARS = [2021, 2022, 2023]
 
+# partitions: remplace seulement les (state, year) présents dans tmp/ (relançable)
+# append: ajoute tout, doublonne les lignes si on relance
+LOAD_MODES = ("partitions", "append")
 
 
+def insert(filename, sink=None, mode="partitions"):
+    from sqlalchemy import Float, Integer, String
 
-def insert(filename):
-    df = pd.read_csv(f"../tmp/{filename}.csv")
+    df = staging.read_table(filename)
 
     df = clean_csv.clean(df)
 
-    # Connexion SQLAlchemy
-    engine = create_engine( "mssql+pyodbc://localhost\\SQLEXPRESS/USA?driver=ODBC+Driver+17+for+SQL+Server&TrustServerCertificate=yes&Trusted_Connection=yes",
-                           fast_executemany=True
-                           )
-
-    # Insérer le DataFrame dans SQL Server
-    df.to_sql(
-        f"{filename}",  # nom de la table
-        engine,
-        if_exists="append",  # "append" pour insérer sans recréer la table
-        index=False,
-        dtype={  # schéma SQL
-            "state": String(100),
-            "year": Integer,
-            "indicator": String(255),
-            "estimate": Float,
-            "percent": Float
-        }
-    )
+    # Une connexion du pool du sink pour toute la table (une par thread)
+    sink = sink or sinks.get_sink()
+
+    dtype = {  # schéma SQL
+        "state": String(100),
+        "year": Integer,
+        "indicator": String(255),
+        "estimate": Float,
+        "percent": Float
+    }
+
+    # Insérer le DataFrame dans la base
+    if mode == "partitions":
+        stats = sink.replace_partitions(filename, df, keys=("state", "year"), dtype=dtype)
+    elif mode == "append":
+        # "append" pour insérer sans recréer la table
+        stats = sink.write(filename, df, if_exists="append", dtype=dtype)
+    else:
+        raise ValueError(f"Mode inconnu: {mode} (attendu: {', '.join(LOAD_MODES)})")
 
     print(f"✅ Données insérées avec succès dans la table {filename} !")
+    return stats
+
+
+def insert_ages(years=AGE_YEARS, sink=None):
+    # Toutes les années en un seul chargement (une seule tâche, une seule
+    # table de staging age_population_staging_<id>)
+    return create_and_insert_table_ages.import_ages_in_sql(years, sink=sink)
+
+
+def load_all(workers=1, sink=None, mode="partitions", tables=TABLES, age_years=AGE_YEARS):
+    """
+    Charge les tables `tables` de tmp/ et age_population pour `age_years`
+    (aucune année: pas de chargement des âges), jusqu'à `workers` en parallèle.
+
+    Retourne le rapport par table: [(table, LoadStats ou None, exception ou None, secondes)].
+    """
+    sink = sink or sinks.get_sink()
+    tasks = [(insert, table, sink, mode) for table in tables]
+    names = list(tables)
+    if age_years:
+        tasks.append((insert_ages, age_years, sink))
+        names.append("age_population")
+
+    # Au plus une connexion du pool par thread, sans déborder du pool
+    workers = min(resolve_workers(workers), db.POOL_SIZE)
+    results = run_threads(lambda func, *args: func(*args), tasks, workers)
+    return [(name, stats, error, seconds) for name, (stats, error, seconds) in zip(names, results)]
+
+
+def print_report(report):
+    print("\n📋 Rapport de chargement")
+    for name, stats, error, seconds in report:
+        if error is None:
+            print(f"  ✅ {stats}")
+        else:
+            print(f"  ❌ {name:<30} {seconds:7.2f}s  {type(error).__name__}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chargement des tables tmp/ et age_population dans SQL Server.")
+    sinks.add_sink_arguments(parser)
+    parser.add_argument("--mode", choices=LOAD_MODES, default="partitions",
+                        help="partitions: remplace les (state, year) chargés (défaut), append: ajoute tout")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"tables chargées en parallèle (1 = séquentiel, 0 = max, borné à DB_POOL_SIZE={db.POOL_SIZE})")
+    args = parser.parse_args(argv)
+
+    sink = sinks.get_sink(args.sink, args.sqlite_path, args.batch_size)
+    report = load_all(args.workers, sink, args.mode)
+    print_report(report)
+    return 1 if any(error is not None for _, _, error, _ in report) else 0
 
 
-insert("class_of_worker")
-insert("commuting_to_work")
-insert("employment_status")
-insert("health_insurance")
-insert("industry")
-insert("occupation")
-insert("poverty")
-create_and_insert_table_ages.import_ages_in_sql(2021)
-create_and_insert_table_ages.import_ages_in_sql(2022)
-create_and_insert_table_ages.import_ages_in_sql(2023)
+if __name__ == "__main__":
+    sys.exit(main())
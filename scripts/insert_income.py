@@ -1,26 +1,37 @@
-import pandas as pd
-import pyodbc
-import numpy as np
+import argparse
+
 import clean_csv
+import sinks
+import staging
+
+
+def income_dtypes(indicator_length):
+    # Schéma SQL de la table fantôme (la cible est créée par schema.py)
+    from sqlalchemy.types import NVARCHAR, Float, Integer
 
+    return {
+        "state_id": NVARCHAR(100),
+        "year_id": Integer(),
+        "indicator": NVARCHAR(indicator_length),
+        "Households_Estimate": Float(),
+        "Families_Estimate": Float(),
+        "Married_couple_families_Estimate": Float(),
+        "Nonfamily_households_Estimate": Float(),
+    }
 
-def insert_income_distribution():
+
+def insert_income_distribution(sink=None):
     # -----------------------
     # Paramètres
     # -----------------------
 
-    # Connexion à SQL Server (adapter à ton environnement)
-    conn = pyodbc.connect("DRIVER={ODBC Driver 17 for SQL Server};"
-                          "SERVER=localhost\\SQLEXPRESS;"
-                          "DATABASE=USA;"
-                          "Trusted_Connection=yes;"
-                          "TrustServerCertificate=yes;", autocommit=True)
-    cursor = conn.cursor()
+    # Backend de chargement (SQL Server par défaut, cible lue dans .env / l'environnement)
+    sink = sink or sinks.get_sink()
 
     # -----------------------
     # 1. Lecture du CSV brut
     # -----------------------
-    df = pd.read_csv("../tmp/income_distribution.csv")
+    df = staging.read_table("income_distribution")
 
 
     # -----------------------
@@ -32,62 +43,26 @@ def insert_income_distribution():
 
     for col in df.columns:
         if col not in ["state_id", "year_id", "indicator"]:
-            try:
-                df[col] = df[col].apply(clean_csv.clean_estimate)
-            except:
-                df[col] = df[col].apply(clean_csv.clean_percent)
-    # -----------------------
-    # 3. Création de la table
-    # -----------------------
-    create_table_sql = """
-    IF OBJECT_ID('dbo.HouseholdIncomeDistribution', 'U') IS NOT NULL
-        DROP TABLE dbo.HouseholdIncomeDistribution;
-
-    CREATE TABLE dbo.HouseholdIncomeDistribution (
-        state_id NVARCHAR(100),
-        year_id INT,
-        indicator NVARCHAR(200),
-        Households_Estimate FLOAT NULL,
-        Families_Estimate FLOAT NULL,
-        Married_couple_families_Estimate FLOAT NULL,
-        Nonfamily_households_Estimate FLOAT NULL
-    );
-    """
-    cursor.execute(create_table_sql)
-    conn.commit()
+            df[col] = clean_csv.clean_estimate_series(df[col])
 
     # -----------------------
-    # 4. Insertion des données
+    # 3. Rechargement des (état, année) présents dans la table pré-créée
     # -----------------------
-    insert_sql = """
-    INSERT INTO dbo.HouseholdIncomeDistribution
-    (state_id, year_id, indicator, Households_Estimate, Families_Estimate, Married_couple_families_Estimate, Nonfamily_households_Estimate)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    """
-
-    for _, row in df.iterrows():
-        values = [None if pd.isna(v) else v for v in row]
-        cursor.execute(insert_sql, tuple(values))
+    # Lots de paramètres (fast_executemany sur SQL Server), une transaction par lot
+    stats = sink.replace_partitions("HouseholdIncomeDistribution", df, keys=("state_id", "year_id"), dtype=income_dtypes(200))
 
-    conn.commit()
+    print(f"✅ {stats.rows} lignes nettoyées et insérées ({sink.name}) avec succès !")
+    return stats
 
-    print("✅ Données nettoyées et insérées dans SQL Server avec succès !")
 
-    cursor.close()
-    conn.close()
-def insert_income_percent_allocated():
+def insert_income_percent_allocated(sink=None):
 
-    conn = pyodbc.connect("DRIVER={ODBC Driver 17 for SQL Server};"
-                          "SERVER=localhost\\SQLEXPRESS;"
-                          "DATABASE=USA;"
-                          "Trusted_Connection=yes;"
-                          "TrustServerCertificate=yes;", autocommit=True)
-    cursor = conn.cursor()
+    sink = sink or sinks.get_sink()
 
     # -----------------------
     # 1. Lecture du CSV brut
     # -----------------------
-    df = pd.read_csv("../tmp/income_percent_allocated.csv")
+    df = staging.read_table("income_percent_allocated")
 
     # -----------------------
     # 2. Nettoyage
@@ -96,51 +71,27 @@ def insert_income_percent_allocated():
 
     for col in df.columns:
         if col not in ["state_id", "year_id", "indicator"]:
-            try:
-                df[col] = df[col].apply(clean_csv.clean_estimate)
-            except:
-                df[col] = df[col].apply(clean_csv.clean_percent)
-
-    # -----------------------
-    # 3. Création de la table
-    # -----------------------
-    create_table_sql = """
-    IF OBJECT_ID('dbo.HouseholdIncomeStats', 'U') IS NOT NULL
-        DROP TABLE dbo.HouseholdIncomeStats;
-
-    CREATE TABLE dbo.HouseholdIncomeStats (
-        state_id NVARCHAR(100),
-        year_id INT,
-        indicator NVARCHAR(100),
-        Households_Estimate FLOAT,
-        Families_Estimate FLOAT NULL,
-        Married_couple_families_Estimate FLOAT NULL,
-        Nonfamily_households_Estimate FLOAT NULL
-    );
-    """
-    cursor.execute(create_table_sql)
-    conn.commit()
+            df[col] = clean_csv.clean_estimate_series(df[col])
 
     # -----------------------
-    # 4. Insertion des données
+    # 3. Rechargement des (état, année) présents dans la table pré-créée
     # -----------------------
-    insert_sql = """
-    INSERT INTO dbo.HouseholdIncomeStats
-    (state_id, year_id, indicator, Households_Estimate, Families_Estimate, Married_couple_families_Estimate, Nonfamily_households_Estimate)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    """
+    stats = sink.replace_partitions("HouseholdIncomeStats", df, keys=("state_id", "year_id"), dtype=income_dtypes(100))
 
-    for _, row in df.iterrows():
-        values = [None if pd.isna(v) else v for v in row]
-        cursor.execute(insert_sql, tuple(values))
+    print(f"✅ {stats.rows} lignes nettoyées et insérées ({sink.name}) avec succès !")
+    return stats
 
-    conn.commit()
 
-    print("✅ Données nettoyées et insérées dans SQL Server avec succès !")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Insertion des tables income dans SQL Server.")
+    sinks.add_sink_arguments(parser)
+    args = parser.parse_args(argv)
 
-    cursor.close()
-    conn.close()
+    sink = sinks.get_sink(args.sink, args.sqlite_path, args.batch_size)
+    insert_income_distribution(sink)
+    insert_income_percent_allocated(sink)
+    sink.report()
 
 
-insert_income_distribution()
-insert_income_percent_allocated()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# -------- NORMALISATION DES LIBELLES --------
+# Les mêmes quelques centaines de libellés se répètent pour chaque année et
+# chaque fichier: on ne normalise que les valeurs uniques, avec un cache
+# conservé d'un appel à l'autre.
+_SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=None)
+def clean_label(x):
+    return _SPACES.sub(" ", x.replace("\xa0", " ")).strip()
+
+
+def clean(x):
+    # Version scalaire (anciens appels Series.map(clean))
+    if pd.isna(x):
+        return ""
+    return clean_label(str(x))
+
+
+def normalize_labels(series):
+    """
+    Normalise une colonne de libellés (NBSP, espaces multiples, indentation).
+
+    factorize -> normalisation des uniques (cache) -> retour sur les codes.
+    Le résultat est un Categorical: les isin / where / ffill qui suivent
+    travaillent sur des codes entiers. Les valeurs manquantes deviennent "".
+    """
+    codes, uniques = pd.factorize(series)
+    cleaned = [clean_label(str(u)) for u in uniques]
+    if (codes == -1).any():
+        codes = np.where(codes == -1, len(cleaned), codes)
+        cleaned.append("")
+
+    # deux libellés bruts peuvent donner le même libellé normalisé
+    label_codes, categories = pd.factorize(pd.Index(cleaned, dtype=object))
+    values = pd.Categorical.from_codes(label_codes[codes], categories=categories)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def as_text(df):
+    # Colonnes catégorielles -> chaînes (tables de faits écrites en CSV/SQL)
+    cat_cols = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    return df.astype({c: object for c in cat_cols})
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from parallel import run_tasks
+
+# -------- CONFIG --------
+# Cache local des partitions (année, groupe) déjà calculées
+script_dir = os.path.dirname(os.path.abspath(__file__))
+cache_root = os.path.join(script_dir, '..', 'tmp', '.cache')
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="ignorer le cache et recalculer toutes les partitions")
+    return parser
+
+
+# -------- EMPREINTES --------
+def file_hash(path, chunk_size=1 << 20):
+    # Hash sha256 du contenu d'un fichier source
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(*paths):
+    # Version du code de transformation = hash des fichiers sources qui
+    # déterminent le contenu des partitions
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def source_key(path, *options):
+    # Empreinte d'une entrée = contenu du fichier + options qui changent le
+    # résultat (ex: filtre de géographies)
+    key = file_hash(path)
+    if options:
+        key += ":" + hashlib.sha256(repr(options).encode()).hexdigest()[:16]
+    return key
+
+
+# -------- MANIFESTE --------
+class PartitionCache:
+    """
+    Cache des partitions d'une transformation, décrit par un manifeste JSON:
+        {"<année>/<groupe>": {"source": <empreinte>, "code": <version>, "file": <pickle>}}
+
+    Une partition est réutilisée si l'empreinte de sa source et la version du
+    code sont inchangées; sinon elle doit être recalculée puis enregistrée.
+    """
+
+    def __init__(self, name, version, directory=None, enabled=True):
+        self.version = version
+        self.enabled = enabled
+        self.directory = os.path.join(directory or cache_root, name)
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        self.entries = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(year, group):
+        return f"{year}/{group}"
+
+    def is_fresh(self, year, group, source):
+        entry = self.entries.get(self.key(year, group))
+        return (
+            self.enabled
+            and entry is not None
+            and entry["source"] == source
+            and entry["code"] == self.version
+            and os.path.exists(os.path.join(self.directory, entry["file"]))
+        )
+
+    def load(self, year, group):
+        entry = self.entries[self.key(year, group)]
+        return pd.read_pickle(os.path.join(self.directory, entry["file"]))
+
+    def store(self, year, group, source, df):
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"{year}_{group}.pkl"
+        df.to_pickle(os.path.join(self.directory, file_name))
+        self.entries[self.key(year, group)] = {"source": source, "code": self.version, "file": file_name}
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+
+# -------- RECONSTRUCTION INCREMENTALE --------
+def build_partitions(files, group_names, year_of, process_file, process_file_group, cache,
+                     options=(), workers=1, split_groups=False):
+    # Recalcule uniquement les partitions (année, groupe) dont la source ou le
+    # code a changé, réutilise les autres depuis le cache, et renvoie
+    # {groupe: [DataFrame par année, dans l'ordre de files]}.
+    sources = {path: source_key(path, *options) for path in files}
+    stale = [
+        (path, group_name)
+        for path in files
+        for group_name in group_names
+        if not cache.is_fresh(year_of(path), group_name, sources[path])
+    ]
+
+    if split_groups:
+        task_paths = [path for path, _ in stale]
+        tasks = [(path, group_name, *options) for path, group_name in stale]
+        results = run_tasks(process_file_group, tasks, workers)
+    else:
+        task_paths = list(dict.fromkeys(path for path, _ in stale))
+        results = run_tasks(process_file, [(path, *options) for path in task_paths], workers)
+
+    computed = {}
+    for path, tables in zip(task_paths, results):
+        for group_name, table_df in tables.items():
+            computed[(path, group_name)] = table_df
+            cache.store(year_of(path), group_name, sources[path], table_df)
+    cache.save()
+
+    all_tables = {group_name: [] for group_name in group_names}
+    for path in files:
+        for group_name in group_names:
+            table_df = computed.get((path, group_name))
+            if table_df is None:
+                table_df = cache.load(year_of(path), group_name)
+            all_tables[group_name].append(table_df)
+
+    reused = len(files) * len(group_names) - len(computed)
+    print(f"♻️ {len(computed)} partition(s) recalculée(s), {reused} réutilisée(s) depuis le cache.")
+    return all_tables
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# -------- EXECUTION PARALLELE DES TRANSFORMATIONS --------
+def add_worker_arguments(parser):
+    # Options communes aux scripts de transformation
+    parser.add_argument("--workers", type=int, default=1,
+                        help="nombre de processus (1 = séquentiel, 0 = tous les coeurs)")
+    parser.add_argument("--split-groups", action="store_true",
+                        help="une tâche par (année, groupe) au lieu d'une tâche par année")
+    return parser
+
+
+def resolve_workers(workers):
+    if workers is None or workers < 0:
+        return 1
+    if workers == 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def run_tasks(func, tasks, workers=1):
+    # Exécute func(*task) pour chaque tâche.
+    # Les résultats sont renvoyés dans l'ordre des tâches, quel que soit
+    # l'ordre de fin des processus, pour que la fusion reste déterministe.
+    workers = resolve_workers(workers)
+    if workers == 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+
+    # spawn plutôt que fork: l'appelant peut être un thread (branches
+    # parallèles de pipeline.py), et forker un process multithreadé peut
+    # bloquer sur un verrou hérité
+    spawn = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=spawn) as pool:
+        futures = [pool.submit(func, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+# -------- EXECUTION CONCURRENTE DES CHARGEMENTS --------
+def run_threads(func, tasks, workers=1):
+    """
+    Exécute func(*task) dans un pool de threads borné (chargements SQL:
+    le temps est passé à attendre le serveur, pas en calcul Python).
+
+    Une erreur n'interrompt pas les autres tâches: chaque tâche renvoie
+    (résultat, exception ou None, durée en secondes), dans l'ordre des tâches.
+    """
+    def timed(task):
+        start = time.perf_counter()
+        try:
+            return func(*task), None, time.perf_counter() - start
+        except Exception as exc:
+            return None, exc, time.perf_counter() - start
+
+    workers = resolve_workers(workers)
+    if workers == 1 or len(tasks) <= 1:
+        return [timed(task) for task in tasks]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(timed, tasks))
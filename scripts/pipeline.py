@@ -0,0 +1,353 @@
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import sinks
+from manifest import cache_root, code_version, file_hash
+
+# -------- CONFIG --------
+# Sources brutes: un sous-dossier par source (education, employment, income,
+# population_profile). Etat des étapes: tmp/.cache/pipeline.json
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_ROOT = os.path.join(script_dir, "..", "Data_Source_1", "Data Source")
+STATE_PATH = os.path.join(cache_root, "pipeline.json")
+
+
+def source_files(folder, pattern):
+    def files(args):
+        return sorted(glob.glob(os.path.join(args.data_root, folder, pattern)))
+    return files
+
+
+def local_modules(*names):
+    """
+    Fichiers des modules de scripts/ importés (directement ou non, y compris
+    les imports différés dans les fonctions) par les modules `names`: le
+    code dont dépend le résultat d'une étape.
+    """
+    found, todo = [], list(names)
+    while todo:
+        name = todo.pop()
+        path = os.path.join(script_dir, f"{name}.py")
+        if path in found or not os.path.exists(path):
+            continue
+        found.append(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                todo.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                todo.append(node.module)
+    return sorted(found)
+
+
+def file_year(path):
+    return int(os.path.basename(path).split("_")[-1].split(".")[0])
+
+
+def transform_argv(args, folder):
+    return ["--data-dir", os.path.join(args.data_root, folder), "--workers", str(args.workers)]
+
+
+def sink_argv(args):
+    return ["--sink", args.sink, "--sqlite-path", args.sqlite_path, "--batch-size", str(args.batch_size)]
+
+
+# -------- ETAPES --------
+# Chaque étape reçoit (args, sink, full): full = étape jamais réussie sur
+# cette cible, forcée ou en reprise (pas seulement des sources modifiées).
+# Une exception = échec de l'étape.
+def run_create_db(args, sink, full):
+    if args.sink != "mssql":
+        print("⏭️ create_db: base SQLite créée à la première connexion")
+        return
+    import create_db
+    create_db.create_database()
+
+
+def run_ddl(args, sink, full):
+    import create_tables
+    create_tables.create_tables(sink.engine)
+
+
+def run_transform_employment(args, sink, full):
+    import transform_employment
+    transform_employment.main(transform_argv(args, "employment"))
+
+
+def run_transform_income(args, sink, full):
+    import transform_income
+    transform_income.main(transform_argv(args, "income"))
+
+
+def run_transform_education(args, sink, full):
+    # Faits par année dans le cache de partitions (réutilisés au chargement)
+    import education
+    education.build_facts_incremental(os.path.join(args.data_root, "education"))
+
+
+def run_load_employment(args, sink, full):
+    import insert_file_tmp_in_sql
+    report = insert_file_tmp_in_sql.load_all(args.workers, sink, tables=insert_file_tmp_in_sql.TABLES, age_years=())
+    insert_file_tmp_in_sql.print_report(report)
+    failed = [name for name, _, error, _ in report if error is not None]
+    if failed:
+        raise RuntimeError(f"tables non chargées: {', '.join(failed)}")
+
+
+def run_load_income(args, sink, full):
+    import insert_income
+    insert_income.insert_income_distribution(sink)
+    insert_income.insert_income_percent_allocated(sink)
+
+
+def run_load_population(args, sink, full):
+    import create_and_insert_table_ages
+    folder = os.path.join(args.data_root, "population_profile")
+    years = [file_year(path) for path in STAGES["load_population"]["inputs"](args)]
+    # update: une étape relancée (source modifiée) rafraîchit les lignes existantes
+    create_and_insert_table_ages.import_ages_in_sql(years, mode="update", sink=sink, folder=folder)
+
+
+def run_load_education(args, sink, full):
+    import education
+    folder = os.path.join(args.data_root, "education")
+    df = education.load_education_files(folder)
+    dims = education.build_dims(df)
+    facts = education.build_facts_incremental(folder)
+    facts = {name: education.encode_fact(fact, dims) for name, fact in facts.items()}
+    education.load_star(sink.engine, dims, facts)
+
+
+def run_rollups(args, sink, full):
+    # Incrémental (années modifiées) sauf si la cible n'a pas tous les rollups
+    import rollups
+    argv = sink_argv(args) + ["--education-dir", os.path.join(args.data_root, "education")]
+    rollups.main(argv + ["--full-rebuild"] if full else argv)
+
+
+# -------- GRAPHE DECLARE --------
+# deps: étapes à terminer avant, code: module(s) d'entrée de l'étape (les
+# modules de scripts/ qu'ils importent sont suivis, voir local_modules),
+# inputs: fichiers sources lus. Ordre de déclaration = un ordre topologique.
+# Branches indépendantes: employment, income, population, education.
+STAGES = {
+    "create_db": {"deps": [], "code": ["create_db"], "run": run_create_db},
+    "ddl": {"deps": ["create_db"], "code": ["create_tables"], "run": run_ddl},
+    "transform_employment": {
+        "deps": [],
+        "code": ["transform_employment"],
+        "inputs": source_files("employment", "employment_*.csv"),
+        "run": run_transform_employment,
+    },
+    "transform_income": {
+        "deps": [],
+        "code": ["transform_income"],
+        "inputs": source_files("income", "total_income_*.csv"),
+        "run": run_transform_income,
+    },
+    "transform_education": {
+        "deps": [],
+        "code": ["education"],
+        "inputs": source_files("education", "education_[0-9][0-9][0-9][0-9].csv"),
+        "run": run_transform_education,
+    },
+    "load_employment": {
+        "deps": ["transform_employment", "ddl"],
+        "code": ["insert_file_tmp_in_sql"],
+        "run": run_load_employment,
+    },
+    "load_income": {
+        "deps": ["transform_income", "ddl"],
+        "code": ["insert_income"],
+        "run": run_load_income,
+    },
+    "load_population": {
+        "deps": ["ddl"],
+        "code": ["create_and_insert_table_ages"],
+        "inputs": source_files("population_profile", "*.csv"),
+        "run": run_load_population,
+    },
+    "load_education": {
+        "deps": ["transform_education", "ddl"],
+        "code": ["education"],
+        "run": run_load_education,
+    },
+    "rollups": {
+        "deps": ["load_employment", "load_income", "load_education"],
+        "code": ["rollups"],
+        "run": run_rollups,
+    },
+}
+
+
+def descendants(stages, roots):
+    # Etapes en aval de `roots` (roots comprises), dans l'ordre de déclaration
+    found = set(roots)
+    for name, spec in stages.items():
+        if found.intersection(spec["deps"]):
+            found.add(name)
+    return [name for name in stages if name in found]
+
+
+def stage_keys(stages, args):
+    """
+    Empreinte de chaque étape: version du code, contenu des fichiers sources,
+    options de chargement et empreintes des étapes amont. Une source ou un
+    module modifié change la clé de l'étape et de toutes celles en aval.
+    """
+    import db
+    target = os.path.abspath(args.sqlite_path) if args.sink == "sqlite" else f"{db.SERVER}/{db.DATABASE}"
+    keys = {}
+    for name, spec in stages.items():
+        digest = hashlib.sha256(name.encode())
+        digest.update(code_version(*local_modules(*spec["code"])).encode())
+        for path in spec.get("inputs", lambda args: [])(args):
+            digest.update(os.path.basename(path).encode())
+            digest.update(file_hash(path).encode())
+        digest.update(repr((args.sink, target, args.data_root)).encode())
+        for dep in spec["deps"]:
+            digest.update(keys[dep].encode())
+        keys[name] = digest.hexdigest()[:16]
+    return keys
+
+
+# -------- ETAT (reprise) --------
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+# Raisons d'exécution où seules les sources ont changé (la cible est à jour
+# pour le reste): les étapes incrémentales peuvent s'en contenter
+INCREMENTAL_REASONS = ("code ou sources modifiés", "amont relancé")
+
+
+def plan(stages, keys, state, forced=()):
+    """
+    Etapes à exécuter: forcées, en échec ou jamais réussies, clé modifiée, ou
+    en aval d'une étape exécutée. Les autres sont à jour et sautées.
+    Retourne {étape: raison} pour les étapes à exécuter.
+    """
+    todo = {}
+    for name, spec in stages.items():
+        entry = state.get(name, {})
+        if name in forced:
+            todo[name] = "forcée"
+        elif entry.get("status") != "ok":
+            todo[name] = "échec précédent" if entry.get("status") == "failed" else "jamais exécutée"
+        elif entry.get("key") != keys[name]:
+            todo[name] = "code ou sources modifiés"
+        elif any(dep in todo for dep in spec["deps"]):
+            todo[name] = "amont relancé"
+    return todo
+
+
+# -------- EXECUTION --------
+def run_stage(name, args, sink, full):
+    start = time.perf_counter()
+    STAGES[name]["run"](args, sink, full)
+    return time.perf_counter() - start
+
+
+def run_pipeline(args, todo, keys, state):
+    """
+    Exécute les étapes de `todo` dès que leurs dépendances sont terminées,
+    jusqu'à args.jobs à la fois (branches indépendantes en parallèle).
+
+    L'état est enregistré après chaque étape: un run suivant reprend à
+    l'étape en échec. Les étapes en aval d'un échec sont bloquées, les
+    branches indépendantes continuent. Retourne {étape: statut}.
+    """
+    sink = sinks.get_sink(args.sink, args.sqlite_path, args.batch_size)
+    status = {name: "skipped" for name in STAGES if name not in todo}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+        while True:
+            for name in todo:
+                if name in status or name in running.values():
+                    continue
+                deps = [status.get(dep) for dep in STAGES[name]["deps"]]
+                if any(dep in ("failed", "blocked") for dep in deps):
+                    status[name] = "blocked"
+                    print(f"⛔ {name}: bloquée (échec en amont)")
+                elif all(dep in ("ok", "skipped") for dep in deps):
+                    print(f"▶️ {name} ({todo[name]})")
+                    full = todo[name] not in INCREMENTAL_REASONS
+                    running[pool.submit(run_stage, name, args, sink, full)] = name
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as exc:
+                    status[name] = "failed"
+                    state[name] = {"status": "failed", "key": keys[name], "error": f"{type(exc).__name__}: {exc}"}
+                    print(f"❌ {name}: {type(exc).__name__}: {exc}")
+                else:
+                    status[name] = "ok"
+                    state[name] = {"status": "ok", "key": keys[name], "seconds": round(seconds, 2)}
+                    print(f"✅ {name} ({seconds:.2f}s)")
+                save_state(state, args.state_path)
+    return status
+
+
+def print_report(status, state):
+    print("\n📋 Rapport du pipeline")
+    icons = {"ok": "✅", "skipped": "⏭️", "failed": "❌", "blocked": "⛔"}
+    for name in STAGES:
+        detail = state.get(name, {}).get("error", "") if status[name] == "failed" else ""
+        print(f"  {icons[status[name]]} {name:<22} {status[name]:<8} {detail}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline complet: transformation, DDL, chargements puis rollups.")
+    sinks.add_sink_arguments(parser)
+    parser.add_argument("--data-root", default=DATA_ROOT,
+                        help="dossier des sources (education/, employment/, income/, population_profile/)")
+    parser.add_argument("--jobs", type=int, default=4, help="étapes exécutées en parallèle (branches indépendantes)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processus des transformations / threads des chargements par étape")
+    parser.add_argument("--force", action="store_true", help="relancer toutes les étapes")
+    parser.add_argument("--from", dest="start", choices=list(STAGES),
+                        help="relancer cette étape et toutes celles en aval")
+    parser.add_argument("--dry-run", action="store_true", help="afficher le plan sans rien exécuter")
+    parser.add_argument("--state-path", default=STATE_PATH, help="fichier d'état des étapes (reprise)")
+    args = parser.parse_args(argv)
+
+    keys = stage_keys(STAGES, args)
+    state = load_state(args.state_path)
+    forced = list(STAGES) if args.force else descendants(STAGES, [args.start]) if args.start else []
+    todo = plan(STAGES, keys, state, forced)
+
+    if args.dry_run:
+        for name in STAGES:
+            print(f"  {'▶️' if name in todo else '⏭️'} {name:<22} {todo.get(name, 'à jour')}")
+        return 0
+
+    status = run_pipeline(args, todo, keys, state)
+    print_report(status, state)
+    return 1 if any(value in ("failed", "blocked") for value in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
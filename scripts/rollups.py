@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import clean_csv
+import geography
+import sinks
+import staging
+from manifest import PartitionCache, add_cache_arguments, code_version
+
+# -------- NIVEAUX --------
+# state: chaque géographie publiée (hors agrégat national)
+# region: somme des états de chaque région du Census
+# national: somme des 50 états + DC (mesures additives) ou ligne publiée
+#           "United States" (médianes, taux sans effectifs)
+NATIONAL = "United States"
+STATE_REGION = {state: region for region, states in geography.REGIONS.items() for state in states}
+script_dir = os.path.dirname(os.path.abspath(__file__))
+EDUCATION_DIR = os.path.join(script_dir, "..", "Data_Source_1", "Data Source", "education")
+
+
+# -------- SOURCES --------
+# Chaque source renvoie un DataFrame (state, year, ...) toutes années confondues
+def employment_source(name):
+    def load(args):
+        return clean_csv.clean(staging.read_table(name))
+    return load
+
+
+def income_source(name):
+    def load(args):
+        df = staging.read_table(name)
+        df.columns = df.columns.str.replace(r'[^A-Za-z0-9]+', '_', regex=True)
+        return df.rename(columns={"state_id": "state", "year_id": "year"})
+    return load
+
+
+def education_source(name):
+    def load(args):
+        import education
+        return education.build_facts_incremental(args.education_dir)[name]
+    return load
+
+
+SOURCES = {
+    "age_by_education": education_source("age_by_education"),
+    "earning_by_education": education_source("earning_by_education"),
+    "employment_status": employment_source("employment_status"),
+    "health_insurance": employment_source("health_insurance"),
+    "poverty": employment_source("poverty"),
+    "income_distribution": income_source("income_distribution"),
+}
+
+
+# -------- PREPARATION (une ligne par état, année et clés) --------
+def first_indicators(df, indicators):
+    # Les libellés se répètent par sous-population: la 1re occurrence est le total
+    df = df[df["indicator"].isin(indicators)].drop_duplicates(["state", "year", "indicator"])
+    wide = df.pivot(index=["state", "year"], columns="indicator", values="estimate")
+    wide = wide.reindex(columns=indicators).rename_axis(columns=None)
+    return wide.reset_index()
+
+
+def education_shares(df):
+    import education
+    # Niveaux d'études seulement, 1re occurrence (section AGE BY EDUCATIONAL ATTAINMENT)
+    df = df[education.is_education_level(df["education"])]
+    df = df.drop_duplicates(["state", "year", "age_group", "education"]).copy()
+    for sex in ("total", "male", "female"):
+        estimate = df[f"{sex}_estimate"].astype("float64")
+        percent = df[f"{sex}_percent"]
+        # population de la tranche d'âge reconstituée depuis le pourcentage publié
+        df[f"{sex}_base"] = (estimate / percent).where(percent > 0)
+        df[f"{sex}_estimate"] = estimate
+    return df
+
+
+def earnings_by_sex(df):
+    df = df.copy()
+    for sex in ("total", "male", "female"):
+        df[f"{sex}_median"] = df.pop(f"{sex}_estimate").astype("float64")
+    return df
+
+
+def unemployment(df):
+    wide = first_indicators(df, ["Civilian labor force", "Unemployed"])
+    return wide.rename(columns={"Civilian labor force": "civilian_labor_force", "Unemployed": "unemployed"})
+
+
+def health_insurance(df):
+    indicators = ["Civilian noninstitutionalized population", "With health insurance coverage",
+                  "No health insurance coverage"]
+    wide = first_indicators(df, indicators)
+    return wide.rename(columns=dict(zip(indicators, ["population", "insured", "uninsured"])))
+
+
+def poverty_rate(df):
+    df = df[df["indicator"] == "All people"].drop_duplicates(["state", "year"])
+    return df[["state", "year"]].assign(poverty_rate=df["percent"] / 100)
+
+
+def household_income(df):
+    total = df[df["indicator"] == "Total"].set_index(["state", "year"])["Households_Estimate"]
+    mean = df[df["indicator"] == "Mean income (dollars)"].set_index(["state", "year"])["Households_Estimate"]
+    median = df[df["indicator"] == "Median income (dollars)"].set_index(["state", "year"])["Households_Estimate"]
+    out = pd.DataFrame({"households": total})
+    # revenu total = moyenne x ménages: additif, la moyenne régionale en découle
+    out["household_income"] = mean.reindex(out.index) * out["households"]
+    out["median_income"] = median.reindex(out.index)
+    return out.reset_index()
+
+
+# -------- ROLLUPS DECLARES --------
+# source: table de faits / staging, prepare: mise en forme par état,
+# keys: clés en plus de (level, geo, year), sums: mesures additives (sommées
+# aux niveaux region / national), published: mesures non additives (état +
+# ligne nationale publiée), ratios: sortie -> (numérateur, dénominateur)
+ROLLUPS = {
+    "rollup_education_shares": {
+        "source": "age_by_education",
+        "prepare": education_shares,
+        "keys": ["age_group", "education"],
+        "sums": ["total_estimate", "total_base", "male_estimate", "male_base", "female_estimate", "female_base"],
+        "ratios": {
+            "total_share": ("total_estimate", "total_base"),
+            "male_share": ("male_estimate", "male_base"),
+            "female_share": ("female_estimate", "female_base"),
+        },
+    },
+    "rollup_earnings_by_sex": {
+        "source": "earning_by_education",
+        "prepare": earnings_by_sex,
+        "keys": ["education"],
+        "published": ["total_median", "male_median", "female_median"],
+        "ratios": {"female_to_male": ("female_median", "male_median")},
+        "differences": {"male_minus_female": ("male_median", "female_median")},
+    },
+    "rollup_unemployment": {
+        "source": "employment_status",
+        "prepare": unemployment,
+        "sums": ["civilian_labor_force", "unemployed"],
+        "ratios": {"unemployment_rate": ("unemployed", "civilian_labor_force")},
+    },
+    "rollup_health_insurance": {
+        "source": "health_insurance",
+        "prepare": health_insurance,
+        "sums": ["population", "insured", "uninsured"],
+        "ratios": {"insured_rate": ("insured", "population"), "uninsured_rate": ("uninsured", "population")},
+    },
+    "rollup_poverty": {
+        "source": "poverty",
+        "prepare": poverty_rate,
+        "published": ["poverty_rate"],
+    },
+    "rollup_household_income": {
+        "source": "income_distribution",
+        "prepare": household_income,
+        "sums": ["households", "household_income"],
+        "published": ["median_income"],
+        "ratios": {"mean_income": ("household_income", "households")},
+    },
+}
+
+
+# -------- CALCUL VECTORISE --------
+def aggregate(df, keys, measures, geo):
+    # Somme des mesures par (geo, year, clés); NaN si aucune valeur
+    grouped = df.assign(geo=geo).groupby(["geo", "year"] + keys, sort=False, observed=True)
+    return grouped[measures].sum(min_count=1).reset_index()
+
+
+def compute_rollup(spec, df):
+    """
+    Un rollup pour les années présentes dans df (déjà préparé: state, year,
+    clés, mesures): niveaux state, region et national en une passe groupby
+    par niveau, puis ratios / différences calculés sur les sommes.
+    """
+    keys, sums, published = spec.get("keys", []), spec.get("sums", []), spec.get("published", [])
+    cols = ["year"] + keys + sums + published
+
+    frames = [df.loc[df["state"] != NATIONAL, cols].assign(level="state", geo=df["state"])]
+    if sums:
+        states = df[df["state"].isin(STATE_REGION)]
+        frames.append(aggregate(states, keys, sums, states["state"].map(STATE_REGION)).assign(level="region"))
+        national = aggregate(states, keys, sums, NATIONAL).assign(level="national")
+        if published:
+            # mesures non additives: valeurs publiées pour le pays
+            published_rows = df.loc[df["state"] == NATIONAL, ["year"] + keys + published]
+            national = national.merge(published_rows, on=["year"] + keys, how="left")
+        frames.append(national)
+    else:
+        frames.append(df.loc[df["state"] == NATIONAL, cols].assign(level="national", geo=NATIONAL))
+
+    out = pd.concat(frames, ignore_index=True)
+    for name, (num, den) in spec.get("ratios", {}).items():
+        out[name] = out[num] / out[den].where(out[den] != 0)
+    for name, (a, b) in spec.get("differences", {}).items():
+        out[name] = out[a] - out[b]
+    return out[["level", "geo"] + [c for c in out.columns if c not in ("level", "geo")]]
+
+
+def frame_key(df):
+    # Empreinte du contenu d'une partition source (année)
+    hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+def rollup_cache(sink, full_rebuild=False):
+    # Un manifeste par cible: une année n'est à jour que si elle a été
+    # chargée dans cette base-là (URL sans mot de passe)
+    target = hashlib.sha256(sink.engine.url.render_as_string(hide_password=True).encode()).hexdigest()[:12]
+    return PartitionCache(os.path.join("rollups", f"{sink.name}_{target}"), code_version(__file__),
+                          enabled=not full_rebuild)
+
+
+def build_rollups(sources, cache):
+    """
+    Calcule les rollups déclarés année par année. Une année n'est recalculée
+    que si sa partition source (contenu) ou ce module a changé depuis son
+    dernier chargement dans la cible du cache; sinon elle est relue depuis
+    le cache local. Un rollup dont la source est vide est ignoré.
+
+    Retourne {rollup: (DataFrame toutes années, {année recalculée: empreinte source})}.
+    """
+    results = {}
+    for name, spec in ROLLUPS.items():
+        source = sources[spec["source"]]
+        prepared = spec["prepare"](source) if not source.empty else source
+        if prepared.empty:
+            print(f"⚠️ {name}: source {spec['source']} vide, rollup ignoré")
+            continue
+        frames, changed = [], {}
+        for year, part in prepared.groupby("year", sort=True):
+            year = int(year)
+            key = frame_key(part)
+            if cache.is_fresh(year, name, key):
+                frames.append(cache.load(year, name))
+                continue
+            frames.append(compute_rollup(spec, part))
+            changed[year] = key
+        results[name] = (pd.concat(frames, ignore_index=True), changed)
+    return results
+
+
+def load_rollups(results, sink, cache, all_years=False):
+    # Seules les années recalculées sont rechargées (partition year); elles ne
+    # sont inscrites au manifeste qu'une fois chargées
+    for name, (df, changed) in results.items():
+        years = df["year"].unique() if all_years else list(changed)
+        part = df[df["year"].isin(years)]
+        if part.empty:
+            print(f"⏭️ {name}: à jour")
+            continue
+        sink.replace_partitions(name, part, keys=("year",))
+        for year, key in changed.items():
+            cache.store(year, name, key, df[df["year"] == year].reset_index(drop=True))
+        cache.save()
+        print(f"✅ {name}: {len(part)} ligne(s) pour {', '.join(map(str, sorted(np.unique(part['year']))))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tables de synthèse (state / region / national x année).")
+    sinks.add_sink_arguments(parser)
+    add_cache_arguments(parser)
+    parser.add_argument("--education-dir", default=EDUCATION_DIR,
+                        help="dossier des fichiers education_YYYY.csv")
+    args = parser.parse_args(argv)
+
+    needed = dict.fromkeys(spec["source"] for spec in ROLLUPS.values())
+    sources = {name: SOURCES[name](args) for name in needed}
+
+    sink = sinks.get_sink(args.sink, args.sqlite_path, args.batch_size)
+    cache = rollup_cache(sink, full_rebuild=args.full_rebuild)
+    results = build_rollups(sources, cache)
+    load_rollups(results, sink, cache, all_years=args.full_rebuild)
+    sink.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import threading
+
+# -------- CONFIG --------
+# Partitionnement par année (SQL Server): une partition par année chargée,
+# les années nouvelles ajoutent leur borne (SPLIT) au premier chargement
+PARTITION_FUNCTION = "pf_year"
+PARTITION_SCHEME = "ps_year"
+DEFAULT_YEARS = (2021, 2022, 2023)
+
+# -------- TABLES --------
+# table -> colonnes (nom, type SQL, valable SQL Server et SQLite), colonne
+# année (clé de partition), index unique et clés étrangères éventuels.
+# Les faits sont en columnstore partitionné, les dimensions en rowstore (PK).
+EMPLOYMENT_COLUMNS = [
+    ("state", "varchar(100) NOT NULL"),
+    ("year", "int NOT NULL"),
+    ("indicator", "varchar(255) NULL"),
+    ("estimate", "float NULL"),
+    ("percent", "float NULL"),
+]
+
+
+def income_columns(indicator_length):
+    return [
+        ("state_id", "nvarchar(100) NOT NULL"),
+        ("year_id", "int NOT NULL"),
+        ("indicator", f"nvarchar({indicator_length}) NULL"),
+        ("Households_Estimate", "float NULL"),
+        ("Families_Estimate", "float NULL"),
+        ("Married_couple_families_Estimate", "float NULL"),
+        ("Nonfamily_households_Estimate", "float NULL"),
+    ]
+
+
+# Colonnes de mesure de age_population (dans l'ordre de la table)
+AGE_COLUMNS = [
+    "Under_5_years",
+    "5_to_17_years",
+    "18_to_24_years",
+    "25_to_34_years",
+    "35_to_44_years",
+    "45_to_54_years",
+    "55_to_64_years",
+    "65_to_74_years",
+    "75_years_and_over",
+]
+AGE_POPULATION_COLUMNS = [
+    ("state", "varchar(100) NOT NULL"),
+    ("year", "int NOT NULL"),
+] + [(col, "float NULL") for col in AGE_COLUMNS]
+
+EDUCATION_FOREIGN_KEYS = {
+    "state_id": ("state", "state_id"),
+    "date_id": ("date", "date_id"),
+    "education_id": ("education", "education_id"),
+    "age_id": ("age", "age_id"),
+}
+EDUCATION_COLUMNS = [(key, "int NOT NULL") for key in EDUCATION_FOREIGN_KEYS] + [
+    ("total_estimate", "int NULL"),
+    ("total_percent", "float NULL"),
+    ("male_estimate", "int NULL"),
+    ("male_percent", "float NULL"),
+    ("female_estimate", "int NULL"),
+    ("female_percent", "float NULL"),
+]
+
+FACT_TABLES = {
+    **{name: {"columns": EMPLOYMENT_COLUMNS, "year": "year"} for name in [
+        "class_of_worker",
+        "commuting_to_work",
+        "employment_status",
+        "health_insurance",
+        "industry",
+        "occupation",
+        "poverty",
+    ]},
+    "HouseholdIncomeDistribution": {"columns": income_columns(200), "year": "year_id"},
+    "HouseholdIncomeStats": {"columns": income_columns(100), "year": "year_id"},
+    "age_population": {"columns": AGE_POPULATION_COLUMNS, "year": "year", "unique": ("state", "year")},
+    # date_id = année (clé "intelligente" de dim date): partition directe
+    "age_by_education": {"columns": EDUCATION_COLUMNS, "year": "date_id", "foreign_keys": EDUCATION_FOREIGN_KEYS},
+    "earning_by_education": {"columns": EDUCATION_COLUMNS, "year": "date_id", "foreign_keys": EDUCATION_FOREIGN_KEYS},
+}
+
+DIMENSION_TABLES = {
+    "state": {"columns": [("state_id", "int NOT NULL"), ("state_name", "nvarchar(100) NOT NULL")],
+              "key": "state_id", "unique": ("state_name",)},
+    "age": {"columns": [("age_id", "int NOT NULL"), ("age_group", "nvarchar(200) NOT NULL")],
+            "key": "age_id", "unique": ("age_group",)},
+    "date": {"columns": [("date_id", "int NOT NULL"), ("year", "int NOT NULL")],
+             "key": "date_id", "unique": ("year",)},
+    "education": {"columns": [("education_id", "int NOT NULL"), ("education", "nvarchar(200) NOT NULL")],
+                  "key": "education_id", "unique": ("education",)},
+}
+
+EDUCATION_TABLES = ["state", "age", "date", "education", "age_by_education", "earning_by_education"]
+
+# Création / ajout de bornes sérialisés (chargements en parallèle)
+_lock = threading.Lock()
+
+
+def is_managed(table):
+    return table in FACT_TABLES or table in DIMENSION_TABLES
+
+
+def column_list(spec):
+    return ",\n        ".join(f"[{name}] {sql_type}" for name, sql_type in spec["columns"])
+
+
+def foreign_key_list(table, spec):
+    return "".join(
+        f",\n        CONSTRAINT [FK_{table}_{ref}] FOREIGN KEY ([{col}]) REFERENCES [{ref}] ([{ref_col}])"
+        for col, (ref, ref_col) in spec.get("foreign_keys", {}).items()
+    )
+
+
+# -------- SQL SERVER --------
+def year_bounds(years):
+    # Bornes des années + l'année suivante: la dernière partition reste vide,
+    # un SPLIT ultérieur ne coupe jamais une partition columnstore remplie
+    years = {int(year) for year in years}
+    return sorted(years | {max(years) + 1})
+
+
+def partition_ddl(years=DEFAULT_YEARS):
+    # RANGE RIGHT: chaque année est la borne basse de sa propre partition
+    bounds = ", ".join(str(year) for year in year_bounds(years))
+    return f"""
+    IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = '{PARTITION_FUNCTION}')
+        CREATE PARTITION FUNCTION {PARTITION_FUNCTION} (int) AS RANGE RIGHT FOR VALUES ({bounds});
+    IF NOT EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = '{PARTITION_SCHEME}')
+        CREATE PARTITION SCHEME {PARTITION_SCHEME} AS PARTITION {PARTITION_FUNCTION} ALL TO ([PRIMARY]);
+    """
+
+
+def mssql_ddl(table):
+    """
+    DDL SQL Server d'une table gérée, idempotente (IF OBJECT_ID ... IS NULL).
+
+    Faits: table créée sur le schéma de partition ps_year(<année>), puis index
+    columnstore cluster aligné (élimination de segments et de partitions sur
+    l'année); index unique éventuel aligné lui aussi. Dimensions: PK cluster
+    rowstore et libellé naturel unique.
+    """
+    if table in DIMENSION_TABLES:
+        spec = DIMENSION_TABLES[table]
+        unique = ", ".join(f"[{col}]" for col in spec["unique"])
+        return f"""
+    IF OBJECT_ID('dbo.{table}', 'U') IS NULL
+        CREATE TABLE dbo.[{table}] (
+        {column_list(spec)},
+        CONSTRAINT [PK_{table}] PRIMARY KEY CLUSTERED ([{spec["key"]}]),
+        CONSTRAINT [UQ_{table}] UNIQUE ({unique})
+        );
+    """
+
+    spec = FACT_TABLES[table]
+    on_year = f"{PARTITION_SCHEME}([{spec['year']}])"
+    unique = ""
+    if "unique" in spec:
+        cols = ", ".join(f"[{col}]" for col in spec["unique"])
+        unique = f"\n        CREATE UNIQUE NONCLUSTERED INDEX [UQ_{table}] ON dbo.[{table}] ({cols}) ON {on_year};"
+    return f"""
+    IF OBJECT_ID('dbo.{table}', 'U') IS NULL
+    BEGIN
+        CREATE TABLE dbo.[{table}] (
+        {column_list(spec)}{foreign_key_list(table, spec)}
+        ) ON {on_year};
+        CREATE CLUSTERED COLUMNSTORE INDEX [CCI_{table}] ON dbo.[{table}] ON {on_year};{unique}
+    END
+    """
+
+
+def add_year_partitions(conn, years):
+    # Une borne (SPLIT) par année absente de pf_year; partition vide -> instantané
+    existing = {int(value) for value, in conn.exec_driver_sql(
+        "SELECT CAST(v.value AS int) FROM sys.partition_range_values v "
+        "JOIN sys.partition_functions f ON f.function_id = v.function_id "
+        f"WHERE f.name = '{PARTITION_FUNCTION}'"
+    )}
+    added = [year for year in year_bounds(years) if year not in existing]
+    for year in added:
+        conn.exec_driver_sql(f"ALTER PARTITION SCHEME {PARTITION_SCHEME} NEXT USED [PRIMARY];")
+        conn.exec_driver_sql(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() SPLIT RANGE ({year});")
+    return added
+
+
+# -------- SQLITE (tests locaux) --------
+def sqlite_ddl(table):
+    # Mêmes colonnes et contraintes, sans partition ni columnstore: index sur l'année
+    if table in DIMENSION_TABLES:
+        spec = DIMENSION_TABLES[table]
+        unique = ", ".join(f"[{col}]" for col in spec["unique"])
+        return [f"""
+        CREATE TABLE IF NOT EXISTS [{table}] (
+        {column_list(spec)},
+        PRIMARY KEY ([{spec["key"]}]),
+        UNIQUE ({unique})
+        )"""]
+
+    spec = FACT_TABLES[table]
+    statements = [
+        f"""
+        CREATE TABLE IF NOT EXISTS [{table}] (
+        {column_list(spec)}{foreign_key_list(table, spec)}
+        )""",
+        f"CREATE INDEX IF NOT EXISTS [IX_{table}_{spec['year']}] ON [{table}] ([{spec['year']}])",
+    ]
+    if "unique" in spec:
+        cols = ", ".join(f"[{col}]" for col in spec["unique"])
+        statements.append(f"CREATE UNIQUE INDEX IF NOT EXISTS [UQ_{table}] ON [{table}] ({cols})")
+    return statements
+
+
+# -------- CREATION --------
+def create_table(engine, table, years=()):
+    """
+    Crée la table gérée `table` si elle n'existe pas (jamais de DROP), avec le
+    design physique du backend de l'engine. Sur SQL Server, les années
+    `years` absentes de la fonction de partition y sont ajoutées.
+    """
+    with _lock, engine.begin() as conn:
+        if engine.dialect.name == "mssql":
+            conn.exec_driver_sql(partition_ddl(set(DEFAULT_YEARS) | set(years)))
+            if years and table in FACT_TABLES:
+                add_year_partitions(conn, years)
+            conn.exec_driver_sql(mssql_ddl(table))
+        else:
+            for statement in sqlite_ddl(table):
+                conn.exec_driver_sql(statement)
+
+
+def create_all(engine, tables=None):
+    # Dimensions d'abord (cibles des clés étrangères), faits ensuite
+    tables = tables or list(DIMENSION_TABLES) + list(FACT_TABLES)
+    for table in sorted(tables, key=lambda name: name not in DIMENSION_TABLES):
+        create_table(engine, table)
+
+
+def prepare(engine, table, df):
+    """
+    Avant chargement: crée la table si elle est gérée ici (design physique
+    ci-dessus) et ajoute les partitions des années de df. Retourne False si
+    la table n'est pas gérée (staging, tables fantômes: DDL pandas).
+    """
+    if not is_managed(table):
+        return False
+    spec = FACT_TABLES.get(table)
+    years = df[spec["year"]].dropna().unique().tolist() if spec and spec["year"] in df.columns else ()
+    create_table(engine, table, years)
+    return True
+
+
+def clear(engine, tables):
+    # Vide des tables gérées sans les recréer (faits avant dimensions)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in sorted(tables, key=lambda name: name in DIMENSION_TABLES):
+            conn.exec_driver_sql(f"DELETE FROM {quote(table)}")
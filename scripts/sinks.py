@@ -0,0 +1,177 @@
+import os
+import time
+import uuid
+
+import bulk
+import db
+import schema
+import staging
+
+# -------- CONFIG --------
+# Backends de chargement: SQL Server (cible réelle) ou base SQLite locale
+# (bancs d'essai et tests de non-régression sans serveur)
+SINKS = ("mssql", "sqlite")
+DEFAULT_SINK = os.getenv("DB_SINK", "mssql")
+DEFAULT_SQLITE_PATH = os.path.join(staging.tmp_dir, "usa.sqlite")
+
+
+def add_sink_arguments(parser):
+    parser.add_argument("--sink", choices=SINKS, default=DEFAULT_SINK,
+                        help=f"backend de chargement (défaut: {DEFAULT_SINK}, variable DB_SINK)")
+    parser.add_argument("--sqlite-path", default=DEFAULT_SQLITE_PATH,
+                        help="fichier de la base SQLite locale (--sink sqlite)")
+    bulk.add_batch_arguments(parser)
+    return parser
+
+
+# -------- MESURES --------
+class LoadStats:
+    # Volume et débit d'un chargement de table
+    def __init__(self, table, rows, nbytes, seconds):
+        self.table = table
+        self.rows = rows
+        self.nbytes = nbytes
+        self.seconds = seconds
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+    @property
+    def mb_per_sec(self):
+        return self.nbytes / 1e6 / self.seconds if self.seconds > 0 else float("inf")
+
+    def __str__(self):
+        return (f"{self.table:<30} {self.rows:>9} lignes {self.nbytes / 1e6:8.2f} Mo "
+                f"{self.seconds:7.2f}s {self.rows_per_sec:>10.0f} lignes/s {self.mb_per_sec:7.2f} Mo/s")
+
+
+def frame_bytes(df):
+    # Taille en mémoire des valeurs envoyées (chaînes comprises)
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+
+# -------- BACKENDS --------
+class Sink:
+    """
+    Chargement de DataFrames dans une base, quel que soit le backend.
+
+    write() crée la table si besoin (design physique de schema.py pour les
+    tables de faits, sinon DDL générée par pandas/SQLAlchemy), puis envoie les lignes par lots via bulk.insert_batches sur
+    une connexion DB-API du pool. Chaque écriture est mesurée (lignes,
+    octets, durée) et conservée dans self.stats.
+    """
+
+    name = None
+
+    def __init__(self, engine, batch_size=bulk.DEFAULT_BATCH_SIZE):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.stats = []
+
+    def insert_sql(self, table, columns):
+        quote = self.engine.dialect.identifier_preparer.quote
+        names = ", ".join(quote(col) for col in columns)
+        marks = ", ".join("?" for _ in columns)
+        return f"INSERT INTO {quote(table)} ({names}) VALUES ({marks})"
+
+    def write(self, table, df, dtype=None, if_exists="append"):
+        start = time.perf_counter()
+        self.prepare(table, df, dtype, if_exists)
+
+        rows = self.insert_rows(table, df)
+
+        stats = LoadStats(table, rows, frame_bytes(df), time.perf_counter() - start)
+        self.stats.append(stats)
+        return stats
+
+    def prepare(self, table, df, dtype=None, if_exists="append"):
+        # Tables gérées par schema.py: créées avec leur design physique
+        # (partitions, columnstore), jamais supprimées ni recréées ici
+        if schema.prepare(self.engine, table, df):
+            if if_exists == "replace":
+                raise ValueError(f"{table} est gérée par schema.py: pas de replace (voir replace_partitions)")
+            return
+        # Autres tables (staging, fantômes): DDL seule (0 ligne) générée par pandas
+        with self.engine.begin() as conn:
+            df.head(0).to_sql(table, conn, if_exists=if_exists, index=False, dtype=dtype)
+
+    def insert_rows(self, table, df):
+        raw = self.engine.raw_connection()
+        try:
+            return bulk.insert_batches(raw, self.insert_sql(table, df.columns), df, self.batch_size)
+        finally:
+            raw.close()
+
+    def replace_partitions(self, table, df, keys=("state", "year"), dtype=None):
+        """
+        Rechargement idempotent: remplace exactement les partitions `keys`
+        (ex: (state, year) ou (year,)) présentes dans df, sans toucher aux autres.
+
+        Les lignes sont d'abord chargées dans une table fantôme propre à
+        l'appel (<table>__shadow_<id>: deux rechargements concurrents de la
+        même table ne se mélangent pas), puis une seule transaction supprime
+        les partitions concernées de la table cible et y recopie la table
+        fantôme: un échec laisse la table cible intacte, jamais à moitié
+        chargée. La table fantôme est supprimée dans tous les cas.
+        """
+        start = time.perf_counter()
+        shadow = f"{table}__shadow_{uuid.uuid4().hex[:12]}"
+        quote = self.engine.dialect.identifier_preparer.quote
+
+        self.prepare(table, df, dtype)
+        try:
+            with self.engine.begin() as conn:
+                df.head(0).to_sql(shadow, conn, if_exists="fail", index=False, dtype=dtype)
+            rows = self.insert_rows(shadow, df)
+
+            cols = ", ".join(quote(col) for col in df.columns)
+            same_partition = " AND ".join(
+                f"{quote(shadow)}.{quote(key)} = {quote(table)}.{quote(key)}" for key in keys
+            )
+            with self.engine.begin() as conn:
+                deleted = conn.exec_driver_sql(
+                    f"DELETE FROM {quote(table)} WHERE EXISTS (SELECT 1 FROM {quote(shadow)} WHERE {same_partition})"
+                ).rowcount
+                conn.exec_driver_sql(f"INSERT INTO {quote(table)} ({cols}) SELECT {cols} FROM {quote(shadow)}")
+        finally:
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql(f"DROP TABLE IF EXISTS {quote(shadow)}")
+
+        print(f"🔁 {table}: {deleted} ligne(s) remplacée(s) sur les partitions {', '.join(keys)}")
+        stats = LoadStats(table, rows, frame_bytes(df), time.perf_counter() - start)
+        self.stats.append(stats)
+        return stats
+
+    def report(self):
+        print(f"\n📊 Chargements ({self.name})")
+        for stats in self.stats:
+            print(f"  {stats}")
+
+
+class MssqlSink(Sink):
+    # SQL Server: lots envoyés en tableaux de paramètres (fast_executemany)
+    name = "mssql"
+
+    def __init__(self, batch_size=bulk.DEFAULT_BATCH_SIZE):
+        super().__init__(db.get_engine(), batch_size)
+
+
+class SqliteSink(Sink):
+    # Base SQLite fichier: même chemin de chargement, sans serveur
+    name = "sqlite"
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, batch_size=bulk.DEFAULT_BATCH_SIZE):
+        self.path = os.path.abspath(path)
+        super().__init__(db.engine_for_url(f"sqlite:///{self.path}"), batch_size)
+        # WAL: les lecteurs ne bloquent pas les écritures des autres threads
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+
+def get_sink(kind=DEFAULT_SINK, sqlite_path=DEFAULT_SQLITE_PATH, batch_size=bulk.DEFAULT_BATCH_SIZE):
+    if kind == "mssql":
+        return MssqlSink(batch_size)
+    if kind == "sqlite":
+        return SqliteSink(sqlite_path, batch_size)
+    raise ValueError(f"Sink inconnu: {kind} (attendu: {', '.join(SINKS)})")
@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+
+import clean_csv
+from acs_types import read_acs_csv
+
+# -------- CONFIG --------
+# Zone de staging tmp/ (au même niveau que scripts/)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+tmp_dir = os.path.join(script_dir, '..', 'tmp')
+
+STAGING_FORMATS = ("csv", "parquet")
+KEY_COLUMNS = ("state_id", "year_id", "indicator")
+# Tables dont les mesures "_Estimate" sont publiées en pourcentage ("36.5%")
+PERCENT_TABLES = ("income_percent_allocated",)
+
+
+def add_format_argument(parser):
+    parser.add_argument("--format", default="csv", choices=STAGING_FORMATS,
+                        help="format des tables de staging (parquet = colonnes typées)")
+    return parser
+
+
+# -------- TYPAGE --------
+def to_typed(df, percent=False):
+    # state/indicator en catégories, year en entier, mesures en float
+    # (clean_percent pour 'Percent' et pour toutes les mesures d'une table en
+    # pourcentage (percent=True), clean_estimate pour les autres)
+    df = df.copy()
+    for col in df.columns:
+        if col in ("state_id", "indicator"):
+            df[col] = df[col].astype("category")
+        elif col == "year_id":
+            df[col] = df[col].astype("int64")
+        elif col == "Percent" or percent:
+            df[col] = clean_csv.clean_percent_series(df[col])
+        else:
+            df[col] = clean_csv.clean_estimate_series(df[col])
+    return df
+
+
+# -------- ECRITURE / LECTURE --------
+def table_path(name, fmt, directory=tmp_dir):
+    return os.path.join(directory, f"{name}.{fmt}")
+
+
+def write_table(df, name, fmt="csv", directory=tmp_dir):
+    os.makedirs(directory, exist_ok=True)
+    path = table_path(name, fmt, directory)
+    if fmt == "parquet":
+        to_typed(df, percent=name in PERCENT_TABLES).to_parquet(path, index=False)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Format de staging inconnu: {fmt} (attendu: {', '.join(STAGING_FORMATS)})")
+    return path
+
+
+def read_table(name, directory=tmp_dir):
+    # Lit la version la plus récente de la table (parquet typé ou csv brut)
+    candidates = [table_path(name, fmt, directory) for fmt in STAGING_FORMATS]
+    existing = [path for path in candidates if os.path.exists(path)]
+    if not existing:
+        raise FileNotFoundError(f"Table de staging introuvable: {name} ({directory})")
+
+    path = max(existing, key=os.path.getmtime)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    # CSV: mesures typées dès la lecture (registre acs_types)
+    return read_acs_csv(path, "staging_percent" if name in PERCENT_TABLES else "staging")
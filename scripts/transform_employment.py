@@ -1,7 +1,15 @@
+import argparse
+import numpy as np
 import pandas as pd
 import os
 import glob
 
+import geography
+from geography import add_geography_arguments, project_columns, resolve_geographies
+from manifest import PartitionCache, add_cache_arguments, build_partitions, code_version
+from parallel import add_worker_arguments
+from staging import add_format_argument, write_table
+
 # -------- CONFIG --------
 # Répertoire contenant les fichiers employment_2021.csv, employment_2022.csv, etc.
 data_dir = "E:/Ecole/M2/Architecture_big_data/TP_GROUPE/datalake_demographie_americaine/Data_Source_1/Data Source/employment"
@@ -9,7 +17,6 @@ data_dir = "E:/Ecole/M2/Architecture_big_data/TP_GROUPE/datalake_demographie_ame
 # Répertoire tmp (au même niveau que script/)
 script_dir = os.path.dirname(os.path.abspath(__file__))
 tmp_dir = os.path.join(script_dir, '..', 'tmp')
-os.makedirs(tmp_dir, exist_ok=True)
 
 # -------- GROUPS --------
 groups = {
@@ -110,59 +117,144 @@ summary_labels = {
     "commuting_to_work": ["Workers 16 years and over"],
 }
 
+
+# -------- ROUTAGE DES LABELS --------
+def build_label_router(groups, summary_labels):
+    # Index label -> groupes qui le contiennent (lignes de résumé exclues).
+    # Un label peut appartenir à plusieurs groupes
+    # (ex: "Civilian employed population 16 years and over").
+    router = {}
+    for group_name, group_labels in groups.items():
+        skipped = set(summary_labels.get(group_name, []))
+        for label in group_labels:
+            if label not in skipped:
+                router.setdefault(label, []).append(group_name)
+    return router
+
+
+label_router = build_label_router(groups, summary_labels)
+
 # -------- FONCTION DE TRANSFORMATION --------
+def value_block(df, cols):
+    # Matrice (lignes x colonnes) des valeurs; une colonne absente donne None
+    # (même comportement que row.get(col, None))
+    block = np.full((len(df), len(cols)), None, dtype=object)
+    positions = df.columns.get_indexer(cols)
+    present = np.flatnonzero(positions >= 0)
+    if len(present):
+        block[:, present] = df.iloc[:, positions[present]].to_numpy(dtype=object)
+    return block
+
+
+def reshape_long(sub_df, year_id, state_cols):
+    # Passage large -> long en colonnes entières: une ligne par (label, état),
+    # dans le même ordre que la double boucle labels x états
+    labels = sub_df['Label (Grouping)'].to_numpy(dtype=object)
+    n_states = len(state_cols)
+
+    estimates = value_block(sub_df, [f'{state}!!Estimate' for state in state_cols])
+    percents = value_block(sub_df, [f'{state}!!Percent' for state in state_cols])
+
+    return pd.DataFrame({
+        'state_id': np.tile(np.asarray(state_cols, dtype=object), len(labels)),
+        'year_id': np.full(len(labels) * n_states, year_id, dtype=np.int64),
+        'indicator': np.repeat(labels, n_states),
+        'Estimate': estimates.ravel(),
+        'Percent': percents.ravel()
+    })
+
+
 def process_group(df, group_name, group_labels, year_id, state_cols):
-    sub_df = df[df['Label (Grouping)'].isin(group_labels)].copy()
+    sub_df = df[df['Label (Grouping)'].isin(group_labels)]
 
     # Supprimer les lignes de résumé définies
     if group_name in summary_labels:
         sub_df = sub_df[~sub_df['Label (Grouping)'].isin(summary_labels[group_name])]
 
-    records = []
-    for _, row in sub_df.iterrows():
-        for state in state_cols:
-            records.append({
-                'state_id': state,
-                'year_id': year_id,
-                'indicator': row['Label (Grouping)'],
-                'Estimate': row.get(f'{state}!!Estimate', None),
-                'Percent': row.get(f'{state}!!Percent', None)
-            })
-    return pd.DataFrame(records)
+    return reshape_long(sub_df, year_id, state_cols)
 
 
-# -------- TRAITEMENT DE TOUS LES FICHIERS --------
-files = glob.glob(os.path.join(data_dir, "employment_*.csv"))
+def split_groups(df, year_id, state_cols, router=label_router):
+    # Un seul reshape pour tout le fichier, puis répartition des lignes longues
+    # vers chaque groupe par simple indexation (pas de nouveau scan par groupe)
+    routed = df[df['Label (Grouping)'].isin(router.keys())]
+    long_df = reshape_long(routed, year_id, state_cols)
+
+    positions = {group_name: [] for group_name in groups}
+    for pos, label in enumerate(routed['Label (Grouping)']):
+        for group_name in router[label]:
+            positions.setdefault(group_name, []).append(pos)
 
-# Dictionnaire pour stocker toutes les années concaténées
-all_tables = {group: [] for group in groups.keys()}
+    # La ligne large n°pos occupe les lignes longues [pos*n_states, (pos+1)*n_states)
+    n_states = len(state_cols)
+    offsets = np.arange(n_states, dtype=np.int64)
+    tables = {}
+    for group_name, rows in positions.items():
+        idx = (np.asarray(rows, dtype=np.int64)[:, None] * n_states + offsets).ravel()
+        tables[group_name] = long_df.take(idx).reset_index(drop=True)
+    return tables
 
-for file_path in files:
+
+# -------- TRAITEMENT D'UN FICHIER --------
+def year_of(file_path):
     # Extraire year_id depuis le nom du fichier
-    year_id = int(os.path.basename(file_path).split('_')[-1].split('.')[0])
+    return int(os.path.basename(file_path).split('_')[-1].split('.')[0])
+
+
+def load_year_file(file_path, geographies=None):
+    # Détection des états sur l'en-tête seul, puis lecture des seules colonnes
+    # utiles (label + Estimate/Percent des géographies demandées)
+    usecols, state_cols = project_columns(file_path, geographies, suffixes=("Estimate", "Percent"))
 
     # Charger le CSV
-    df = pd.read_csv(file_path, dtype=str)
+    df = pd.read_csv(file_path, dtype=str, usecols=usecols)
     df['Label (Grouping)'] = df['Label (Grouping)'].str.strip()  # nettoyage
+    return df, state_cols
 
-    # Détection des états
-    state_cols = [col.split('!!')[0] for col in df.columns[1:] if 'Estimate' in col or 'Percent' in col]
-    state_cols = list(dict.fromkeys(state_cols))  # supprimer doublons
 
-    # Garder uniquement les colonnes utiles
-    df = df[['Label (Grouping)'] + [c for c in df.columns if any(state in c for state in state_cols)]]
+def process_file(file_path, geographies=None):
+    # Toutes les tables d'une année (un seul passage sur le fichier)
+    df, state_cols = load_year_file(file_path, geographies)
+    return split_groups(df, year_of(file_path), state_cols)
 
-    # Générer et stocker les tables pour ce fichier
-    for group_name, group_labels in groups.items():
-        table_df = process_group(df, group_name, group_labels, year_id, state_cols)
-        all_tables[group_name].append(table_df)
-
-# -------- CONCATENER ET SAUVEGARDER --------
-for group_name, list_dfs in all_tables.items():
-    if list_dfs:  # si non vide
-        final_df = pd.concat(list_dfs, ignore_index=True)
-        out_file = os.path.join(tmp_dir, f'{group_name}.csv')
-        final_df.to_csv(out_file, index=False)
-        print(f"✅ {group_name}.csv sauvegardé avec {len(final_df)} lignes ({len(list_dfs)} années concaténées).")
-
-print("🎉 Toutes les tables concaténées ont été générées avec succès !")
+
+def process_file_group(file_path, group_name, geographies=None):
+    # Une seule table pour une année: tâche (année, groupe) du mode parallèle
+    df, state_cols = load_year_file(file_path, geographies)
+    router = {label: [group_name] for label, names in label_router.items() if group_name in names}
+    return {group_name: split_groups(df, year_of(file_path), state_cols, router)[group_name]}
+
+
+# -------- TRAITEMENT DE TOUS LES FICHIERS --------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transformation des fichiers employment en tables longues.")
+    parser.add_argument("--data-dir", default=data_dir, help="répertoire des fichiers employment_*.csv")
+    add_geography_arguments(parser)
+    add_worker_arguments(parser)
+    add_format_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    geographies = resolve_geographies(args.states, args.region)
+
+    # Tri par année: l'ordre de concaténation ne dépend pas du système de fichiers
+    files = sorted(glob.glob(os.path.join(args.data_dir, "employment_*.csv")), key=year_of)
+
+    # Seules les partitions (année, groupe) modifiées sont recalculées
+    cache = PartitionCache("employment", code_version(__file__, geography.__file__), enabled=not args.full_rebuild)
+    all_tables = build_partitions(
+        files, list(groups), year_of, process_file, process_file_group, cache,
+        options=(geographies,), workers=args.workers, split_groups=args.split_groups,
+    )
+
+    # -------- CONCATENER ET SAUVEGARDER --------
+    for group_name, list_dfs in all_tables.items():
+        if list_dfs:  # si non vide
+            final_df = pd.concat(list_dfs, ignore_index=True)
+            out_file = write_table(final_df, group_name, args.format, tmp_dir)
+            print(f"✅ {os.path.basename(out_file)} sauvegardé avec {len(final_df)} lignes ({len(list_dfs)} années concaténées).")
+
+    print("🎉 Toutes les tables concaténées ont été générées avec succès !")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
+import argparse
+import numpy as np
 import pandas as pd
 import os
 import glob
 
+import geography
+from geography import add_geography_arguments, project_columns, resolve_geographies
+from manifest import PartitionCache, add_cache_arguments, build_partitions, code_version
+from parallel import add_worker_arguments
+from staging import add_format_argument, write_table
+
 # -------- CONFIG --------
 data_dir = "E:/Ecole/M2/Architecture_big_data/TP_GROUPE/datalake_demographie_americaine/Data_Source_1/Data Source/income"
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 tmp_dir = os.path.join(script_dir, '..', 'tmp')
-os.makedirs(tmp_dir, exist_ok=True)
 
 # -------- GROUPS --------
 groups = {
@@ -34,58 +41,113 @@ groups = {
     ]
 }
 
+# -------- PLAN DE LECTURE DES EN-TETES --------
+def build_header_plan(columns):
+    # En-têtes 'state!!category!!value_type' analysés une seule fois par fichier.
+    # Renvoie les états (ordre du fichier), les mesures ('category_value_type')
+    # et une grille (état, mesure) -> position de colonne (-1 si absente).
+    state_measures = {}
+    for pos, col in enumerate(columns):
+        parts = col.split('!!')
+        if len(parts) == 3:
+            state, category, value_type = parts
+            state_measures.setdefault(state, {})[f"{category}_{value_type}"] = pos
+
+    states = [state for state in state_measures if state not in ('indicator', 'year_id')]
+    measures = list(dict.fromkeys(m for state in states for m in state_measures[state]))
+    measure_index = {measure: j for j, measure in enumerate(measures)}
+
+    grid = np.full((len(states), len(measures)), -1, dtype=np.int64)
+    for i, state in enumerate(states):
+        for measure, pos in state_measures[state].items():
+            grid[i, measure_index[measure]] = pos
+    return states, measures, grid
+
+
 # -------- FONCTION DE TRANSFORMATION --------
-def process_group(df, group_labels, year_id):
+def process_group(df, group_labels, year_id, plan=None):
     # Ignorer la ligne "PERCENT ALLOCATED"
-    sub_df = df[df['Label (Grouping)'].isin(group_labels) & (df['Label (Grouping)'] != "PERCENT ALLOCATED")].copy()
-    records = []
-
-    for _, row in sub_df.iterrows():
-        row_dict = {}
-        row_dict['indicator'] = row['Label (Grouping)']
-        row_dict['year_id'] = year_id
-
-        for col in df.columns[1:]:
-            parts = col.split('!!')
-            if len(parts) == 3:
-                state, category, value_type = parts
-                col_name = f"{category}_{value_type}"  # ex: Households_Estimate
-                if state not in row_dict:
-                    row_dict[state] = {}
-                row_dict[state][col_name] = row[col]
-
-        # Transformer pour chaque état en ligne séparée
-        for state, values in row_dict.items():
-            if state in ['indicator', 'year_id']:
-                continue
-            record = {'state_id': state, 'year_id': year_id, 'indicator': row_dict['indicator']}
-            record.update(values)
-            records.append(record)
+    labels = df['Label (Grouping)']
+    sub_df = df[labels.isin(group_labels) & (labels != "PERCENT ALLOCATED")]
+    if sub_df.empty:
+        return pd.DataFrame()
 
+    states, measures, grid = plan if plan is not None else build_header_plan(df.columns)
+    n_rows, n_states = len(sub_df), len(states)
+
+    # Bloc (lignes, états, mesures) pris directement dans les colonnes du plan;
+    # une mesure absente pour un état donne NaN
+    values = sub_df.to_numpy(dtype=object)
+    block = values[:, np.where(grid >= 0, grid, 0)]
+    block[:, grid < 0] = np.nan
+
+    records = {
+        'state_id': np.tile(np.asarray(states, dtype=object), n_rows),
+        'year_id': np.full(n_rows * n_states, year_id, dtype=np.int64),
+        'indicator': np.repeat(sub_df['Label (Grouping)'].to_numpy(dtype=object), n_states),
+    }
+    flat = block.reshape(n_rows * n_states, len(measures))
+    for j, measure in enumerate(measures):
+        records[measure] = flat[:, j]
     return pd.DataFrame(records)
 
-# -------- TRAITEMENT DE TOUS LES FICHIERS --------
-files = glob.glob(os.path.join(data_dir, "total_income_*.csv"))
+# -------- TRAITEMENT D'UN FICHIER --------
+def year_of(file_path):
+    return int(os.path.basename(file_path).split('_')[-1].split('.')[0])
 
-all_tables = {group: [] for group in groups.keys()}
 
-for file_path in files:
-    year_id = int(os.path.basename(file_path).split('_')[-1].split('.')[0])
-    df = pd.read_csv(file_path, dtype=str)
+def load_year_file(file_path, geographies=None):
+    # Lecture des seules colonnes des géographies demandées (en-tête scanné d'abord)
+    usecols, _ = project_columns(file_path, geographies)
+    df = pd.read_csv(file_path, dtype=str, usecols=usecols)
     df['Label (Grouping)'] = df['Label (Grouping)'].astype(str).str.strip()
+    return df
+
+
+def process_file(file_path, geographies=None):
+    df = load_year_file(file_path, geographies)
+    year_id = year_of(file_path)
+    plan = build_header_plan(df.columns)
+    return {group_name: process_group(df, group_labels, year_id, plan) for group_name, group_labels in groups.items()}
+
+
+def process_file_group(file_path, group_name, geographies=None):
+    # Tâche (année, groupe) du mode parallèle
+    df = load_year_file(file_path, geographies)
+    return {group_name: process_group(df, groups[group_name], year_of(file_path))}
+
+
+# -------- TRAITEMENT DE TOUS LES FICHIERS --------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transformation des fichiers total_income en tables longues.")
+    parser.add_argument("--data-dir", default=data_dir, help="répertoire des fichiers total_income_*.csv")
+    add_geography_arguments(parser)
+    add_worker_arguments(parser)
+    add_format_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    geographies = resolve_geographies(args.states, args.region)
+
+    files = sorted(glob.glob(os.path.join(args.data_dir, "total_income_*.csv")), key=year_of)
+
+    # Seules les partitions (année, groupe) modifiées sont recalculées
+    cache = PartitionCache("income", code_version(__file__, geography.__file__), enabled=not args.full_rebuild)
+    all_tables = build_partitions(
+        files, list(groups), year_of, process_file, process_file_group, cache,
+        options=(geographies,), workers=args.workers, split_groups=args.split_groups,
+    )
+
+    # -------- CONCATENER ET SAUVEGARDER --------
+    for group_name, list_dfs in all_tables.items():
+        if list_dfs:
+            final_df = pd.concat(list_dfs, ignore_index=True)
+            out_file = write_table(final_df, group_name, args.format, tmp_dir)
+            print(f"✅ {os.path.basename(out_file)} sauvegardé avec {len(final_df)} lignes ({len(list_dfs)} années concaténées).")
+        else:
+            print(f"⚠️ Aucun data pour le groupe {group_name}, fichier non créé.")
+
+    print("🎉 Toutes les tables income ont été générées avec succès !")
+
 
-    for group_name, group_labels in groups.items():
-        table_df = process_group(df, group_labels, year_id)
-        all_tables[group_name].append(table_df)
-
-# -------- CONCATENER ET SAUVEGARDER --------
-for group_name, list_dfs in all_tables.items():
-    if list_dfs:
-        final_df = pd.concat(list_dfs, ignore_index=True)
-        out_file = os.path.join(tmp_dir, f'{group_name}.csv')
-        final_df.to_csv(out_file, index=False)
-        print(f"✅ {group_name}.csv sauvegardé avec {len(final_df)} lignes ({len(list_dfs)} années concaténées).")
-    else:
-        print(f"⚠️ Aucun data pour le groupe {group_name}, fichier non créé.")
-
-print("🎉 Toutes les tables income ont été générées avec succès !")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# Les scripts s'importent par leur nom (comme depuis scripts/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # Cache de partitions isolé (pas de tmp/.cache du dépôt)
+    import manifest
+    monkeypatch.setattr(manifest, "cache_root", str(tmp_path / "cache"))
+    return tmp_path / "cache"
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+import education
+
+CATEGORIES = ["Total", "Percent", "Male", "Percent Male", "Female", "Percent Female"]
+
+
+def write_education_csv(path, year, earnings=True):
+    # Fichier education minimal: une tranche d'âge, un niveau, la section revenus
+    labels = [
+        "AGE BY EDUCATIONAL ATTAINMENT",
+        "Population 25 years and over",
+        "Bachelor's degree",
+    ]
+    if earnings:
+        labels += [
+            f"MEDIAN EARNINGS IN THE PAST 12 MONTHS (IN {year} INFLATION-ADJUSTED DOLLARS)",
+            "Population 25 years and over with earnings",
+            "Bachelor's degree",
+        ]
+    data = {"Label (Grouping)": labels}
+    for cat in CATEGORIES:
+        values = ["", "1,000", "250"] + (["", "", "60,000"] if earnings else [])
+        if cat.startswith("Percent"):
+            values = ["", "", "25.0%"] + (["", "", ""] if earnings else [])
+        data[f"Alabama!!{cat}!!Estimate"] = values
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def test_facts_ignore_files_without_year(tmp_path, cache_dir):
+    folder = tmp_path / "education"
+    folder.mkdir()
+    write_education_csv(folder / "education_2021.csv", 2021)
+    write_education_csv(folder / "education_2022.csv", 2022)
+    # export dérivé (age_by_education.py) dans le même dossier
+    write_education_csv(folder / "education_2022_filtered.csv", 2022)
+
+    facts = education.build_facts_incremental(str(folder), full_rebuild=True)
+
+    assert sorted(facts["age_by_education"]["year"].unique()) == [2021, 2022]
+    assert sorted(facts["earning_by_education"]["year"].unique()) == [2021, 2022]
+    assert sorted(education.load_education_files(str(folder))["year"].unique()) == [2021, 2022]
+
+
+def test_age_facts_do_not_need_an_earnings_section(tmp_path):
+    write_education_csv(tmp_path / "education_2021.csv", 2021, earnings=False)
+    df = education.load_education_files(str(tmp_path))
+    long = education.parse_education(df)
+
+    age = education.build_fact_age_by_education(df, long)
+    assert age["education"].tolist() == ["Bachelor's degree"]
+
+    with pytest.raises(RuntimeError, match="MEDIAN EARNINGS"):
+        education.build_fact_earning_by_education(df, long)
@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+import staging
+
+
+def percent_allocated():
+    return pd.DataFrame({
+        "state_id": ["Alabama"],
+        "year_id": [2021],
+        "indicator": ["Household income in the past 12 months"],
+        "Households_Estimate": ["36.5%"],
+        "Families_Estimate": ["(X)"],
+    })
+
+
+def test_to_typed_parses_percent_tables():
+    typed = staging.to_typed(percent_allocated(), percent=True)
+    assert typed["Households_Estimate"].tolist() == [36.5]
+    assert typed["Families_Estimate"].isna().all()
+
+
+@pytest.mark.parametrize("fmt", staging.STAGING_FORMATS)
+def test_percent_allocated_round_trip(tmp_path, fmt):
+    staging.write_table(percent_allocated(), "income_percent_allocated", fmt, str(tmp_path))
+    df = staging.read_table("income_percent_allocated", str(tmp_path))
+    assert df["Households_Estimate"].tolist() == [36.5]